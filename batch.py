@@ -0,0 +1,169 @@
+"""Generazione headless: un CV contro molti annunci, in parallelo.
+
+    python batch.py cv.pdf annunci/ -o output --lang de_ch --concurrency 8
+
+Gli annunci sono una cartella di file .txt/.md (id = nome del file) oppure un
+file .jsonl con righe {"id": ..., "text": ...}. La chiave API viene letta da
+GEMINI_API_KEY.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+from docx_render import create_cv_docx, create_letter_docx
+from generation import generate_async, get_model, parse_response
+from cv_compact import TOKEN_BUDGET, compact_cv
+from pdf_extract import iter_pdf_pages
+from photo import process_photo
+from ranking import cv_index
+
+
+def load_jobs(path):
+    jobs = []
+    if os.path.isdir(path):
+        names = [n for n in sorted(os.listdir(path)) if n.endswith(('.txt', '.md'))]
+        stems = Counter(os.path.splitext(n)[0] for n in names)
+        for name in names:
+            stem = os.path.splitext(name)[0]
+            with open(os.path.join(path, name), encoding='utf-8') as f:
+                # a.txt e a.md: l'estensione resta nell'id per distinguerli
+                jobs.append({"id": stem if stems[stem] == 1 else name, "text": f.read()})
+    else:
+        with open(path, encoding='utf-8') as f:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                text = row.get("text") or row.get("job_text") or row.get("description") or ""
+                jobs.append({"id": str(row.get("id", n)), "text": text})
+        duplicates = sorted(i for i, c in Counter(j["id"] for j in jobs).items() if c > 1)
+        if duplicates:
+            raise ValueError(f"duplicate job ids: {', '.join(duplicates)}")
+    return [j for j in jobs if j["text"].strip()]
+
+def _safe_name(job_id):
+    return re.sub(r'[^\w.-]+', '_', job_id).strip('_') or 'job'
+
+def _output_names(jobs):
+    # id diversi possono dare lo stesso nome di file ("job 1" e "job_1"): suffisso numerico
+    names, used = [], set()
+    for job in jobs:
+        base = name = _safe_name(job["id"])
+        n = 2
+        while name.lower() in used:
+            name = f"{base}-{n}"
+            n += 1
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+async def _generate_with_retry(cv_text, job_text, lang_code, model, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            text = await generate_async(cv_text, job_text, lang_code, model)
+            return parse_response(text)
+        except Exception:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt + random.uniform(0, backoff))
+
+async def _run_job(job, name, cv_text, photo, lang_code, model, sem, out_dir, retries, backoff):
+    async with sem:
+        start = time.perf_counter()
+        try:
+            data = await _generate_with_retry(cv_text, job["text"], lang_code, model, retries, backoff)
+            cv_path = os.path.join(out_dir, f"{name}_CV.docx")
+            letter_path = os.path.join(out_dir, f"{name}_Letter.docx")
+            await asyncio.to_thread(_write_docs, data, photo, lang_code, cv_path, letter_path)
+            return {"id": job["id"], "ok": True, "cv": cv_path, "letter": letter_path,
+                    "seconds": round(time.perf_counter() - start, 2)}
+        except Exception as e:
+            return {"id": job["id"], "ok": False, "error": str(e),
+                    "seconds": round(time.perf_counter() - start, 2)}
+
+def _write_docs(data, photo, lang_code, cv_path, letter_path):
+    with open(cv_path, 'wb') as f:
+        f.write(create_cv_docx(data, photo, lang_code).getvalue())
+    with open(letter_path, 'wb') as f:
+        f.write(create_letter_docx(data['letter_data'], data['personal_info'], lang_code).getvalue())
+
+async def run_batch(cv_path, jobs, out_dir, lang_code='it', concurrency=4, retries=3, backoff=2.0, model=None,
+                    photo_path=None, border=5, min_score=0.0, compact=True, token_budget=TOKEN_BUDGET):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(cv_path, 'rb') as f:
+        pages = list(iter_pdf_pages(f.read()))
+    raw_text = "\n".join(pages)
+    # un solo contesto CV compatto, identico per tutti gli annunci
+    cv_text = compact_cv(pages, token_budget).text if compact else raw_text
+    results = [None] * len(jobs)
+    if min_score > 0:
+        # gli annunci poco affini al CV non arrivano nemmeno al modello
+        scores = cv_index(raw_text).score([job["text"] for job in jobs])
+        for i, (job, score) in enumerate(zip(jobs, scores)):
+            if score < min_score:
+                results[i] = {"id": job["id"], "ok": False, "skipped": True, "match_score": round(float(score), 3),
+                              "seconds": 0.0}
+    photo = None
+    if photo_path:
+        with open(photo_path, 'rb') as f:
+            photo = process_photo(f.read(), border)
+    if model is None:
+        model = get_model(os.environ["GEMINI_API_KEY"])
+    names = _output_names(jobs)
+    todo = [i for i, r in enumerate(results) if r is None]
+    sem = asyncio.Semaphore(concurrency)
+    done = await asyncio.gather(*[_run_job(jobs[i], names[i], cv_text, photo, lang_code, model, sem, out_dir, retries, backoff)
+                                  for i in todo])
+    for i, r in zip(todo, done):
+        results[i] = r
+    return results  # stesso ordine degli annunci in ingresso
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate CV and cover letter DOCX files for many job ads.")
+    parser.add_argument("cv", help="CV in PDF")
+    parser.add_argument("jobs", help="directory of .txt/.md job ads or a .jsonl file")
+    parser.add_argument("-o", "--out", default="batch_output")
+    parser.add_argument("--lang", default="it")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=2.0, help="base delay in seconds")
+    parser.add_argument("--photo", help="profile photo (jpg/png)")
+    parser.add_argument("--border", type=int, default=5, help="photo border in px")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET, help="max CV tokens sent to the model")
+    parser.add_argument("--no-compact", action="store_true", help="send the raw extracted CV text")
+    parser.add_argument("--min-score", type=float, default=0.0, help="skip ads whose CV match score is below this (0-1)")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args.jobs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not jobs:
+        print("No job ads found.", file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    results = asyncio.run(run_batch(args.cv, jobs, args.out, args.lang, args.concurrency, args.retries, args.backoff,
+                                    photo_path=args.photo, border=args.border, min_score=args.min_score,
+                                    compact=not args.no_compact, token_budget=args.token_budget))
+    for r in results:
+        if r.get("skipped"):
+            status = f"skipped (match {r['match_score']})"
+        else:
+            status = "ok" if r["ok"] else f"FAILED: {r['error']}"
+        print(f"{r['id']}: {status} ({r['seconds']}s)")
+    failed = sum(not r["ok"] and not r.get("skipped") for r in results)
+    done = sum(r["ok"] for r in results)
+    print(f"{done}/{len(results)} done, {len(results) - done - failed} skipped in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Benchmark offline dell'intera pipeline con Gemini e SerpAPI finti.
+
+    python benchmarks/bench_pipeline.py --runs 20 --sizes 1 3 8 20 --json bench.json
+
+Per ogni dimensione (pagine del CV sintetico) esegue estrazione PDF, compattazione
+del CV, generazione in streaming + parsing JSON, create_cv_docx, create_letter_docx,
+foto, ricerca lavori e ranking, e riporta i percentili di latenza per fase, i token
+stimati del prompt e il picco di RSS (processo e worker PDF). Ogni dimensione
+gira in un interprete nuovo. Di default le cache vengono svuotate a ogni giro (--warm per tenerle).
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+import cv_compact
+import job_search
+import pdf_extract
+import photo
+from cv_compact import compact_cv, estimate_tokens
+from docx_render import create_cv_docx, create_letter_docx
+from generation import generate_stream, get_generation_cache, parse_response
+from json_stream import StreamingJsonParser
+from metrics import Metrics, percentile
+from ranking import rank_jobs
+
+WORDS = ("python data analysis project management team leadership customer software cloud sales "
+         "marketing engineering design research finance logistics quality training support").split()
+
+
+def make_cv_pages(n_pages, lines_per_page=45, seed=0):
+    # con intestazione, pie' di pagina e qualche riga ripetuta, come un vero export
+    rnd = random.Random(seed)
+    body = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(6, 14))).capitalize()
+            for _ in range(n_pages * (lines_per_page - 2))]
+    body = [line if rnd.random() > 0.1 else rnd.choice(body[:i] or [line]) for i, line in enumerate(body)]
+    per_page = lines_per_page - 2
+    return [["Jane Doe - Curriculum Vitae"] + body[p * per_page:(p + 1) * per_page] + [f"Page {p + 1} of {n_pages}"]
+            for p in range(n_pages)]
+
+def make_pdf(pages):
+    # PDF minimale con testo vero (Helvetica), abbastanza per pypdf.extract_text
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        text = "".join(f"({l.replace(chr(92), '').replace('(', '').replace(')', '')}) Tj T* " for l in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 800 Td {text}ET".encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{k} 0 R" for k in kids).encode(), len(kids))
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (i, obj))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def make_photo(width=3000, height=4000):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (90, 120, 160)).save(out, format='JPEG', quality=90)
+    return out.getvalue()
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Restituisce un JSON plausibile proporzionale al CV, a pezzi se stream=True."""
+
+    def __init__(self, latency=0.0, chunk_chars=200, per_1k_tokens=0.0):
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.per_1k_tokens = per_1k_tokens  # costo simulato dell'input: i prompt lunghi rallentano
+
+    def _delay(self, parts):
+        return self.latency + self.per_1k_tokens * estimate_tokens("".join(parts)) / 1000
+
+    def _answer(self, parts):
+        lines = [l for l in parts[1].splitlines() if l.strip()]
+        data = {
+            "personal_info": {"name": "Jane Doe", "address": "Main St 1", "phone": "+41 00 000 00 00", "email": "jane@example.com"},
+            "cv_sections": {
+                "profile_summary": " ".join(lines[:3]),
+                "experience": lines[3:3 + max(3, len(lines) // 4)],
+                "education": lines[:3],
+                "skills": sorted(set(" ".join(lines).lower().split()))[:20],
+                "languages": ["English", "Italiano"],
+                "interests": ["Hiking"],
+            },
+            "letter_data": {"recipient_block": "HR", "subject_line": "Application", "body_content": " ".join(lines[:20]), "closing": "Best regards"},
+        }
+        return "```json\n" + json.dumps(data, ensure_ascii=False) + "\n```"
+
+    def generate_content(self, parts, stream=False):
+        text = self._answer(parts)
+        if not stream:
+            time.sleep(self._delay(parts))
+            return _Chunk(text)
+        return self._stream(text, self._delay(parts))
+
+    def _stream(self, text, delay):
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            yield _Chunk(chunk)
+
+
+def fake_serpapi_fetch(params, pages=3):
+    page = int(params.get("next_page_token", 0))
+    jobs = [{"job_id": f"{params['q']}-{page}-{i}", "title": f"{random.choice(WORDS).title()} Engineer",
+             "company_name": "ACME", "location": params['q'], "description": " ".join(random.choices(WORDS, k=80))}
+            for i in range(10)]
+    res = {"jobs_results": jobs}
+    if page + 1 < pages:
+        res["serpapi_pagination"] = {"next_page_token": str(page + 1)}
+    return res
+
+def clear_caches():
+    get_generation_cache().clear()
+    pdf_extract._page_cache.clear()
+    cv_compact._compact_cache.clear()
+    photo._photo_cache.clear()
+    job_search._search_cache.clear()
+
+def run_pipeline(pdf_bytes, photo_bytes, job_text, model, metrics, lang_code='en_us', compact=True):
+    with metrics.stage("pdf_extract", bytes_in=len(pdf_bytes)) as m:
+        pages = list(pdf_extract.iter_pdf_pages(pdf_bytes))
+        cv_text = "\n".join(pages)
+        m['chars_out'] = len(cv_text)
+    if compact:
+        with metrics.stage("cv_compact"):
+            cv_text = compact_cv(pages).text
+    parser = StreamingJsonParser()
+    chunks = []
+    with metrics.stage("gemini", prompt_tokens=estimate_tokens(cv_text + job_text)) as m:
+        t0 = time.perf_counter()
+        for chunk in generate_stream(cv_text, job_text, lang_code, api_key=None, model=model):
+            if not chunks:
+                m['first_chunk_s'] = time.perf_counter() - t0
+            chunks.append(chunk)
+            parser.feed(chunk)
+    with metrics.stage("json_parse"):
+        data = parse_response("".join(chunks))
+    with metrics.stage("photo", bytes_in=len(photo_bytes)) as m:
+        img = photo.process_photo(photo_bytes, 5)
+        m['bytes_out'] = len(img)
+    with metrics.stage("create_cv_docx") as m:
+        m['bytes_out'] = len(create_cv_docx(data, img, lang_code).getvalue())
+    with metrics.stage("create_letter_docx") as m:
+        m['bytes_out'] = len(create_letter_docx(data['letter_data'], data['personal_info'], lang_code).getvalue())
+    with metrics.stage("serpapi") as m:
+        jobs = job_search.search_jobs("engineer", ["Zurich", "Bern"], [20], "en", "fake", fetch=fake_serpapi_fetch)
+        m['results'] = len(jobs)
+    with metrics.stage("ranking", jobs=len(jobs)):
+        rank_jobs(cv_text, jobs)
+
+def _rss_mb(maxrss):
+    # ru_maxrss e' in KiB su Linux, in byte su macOS
+    return maxrss / 2 ** 20 if sys.platform == "darwin" else maxrss / 1024
+
+def measure_size(size, args):
+    """Tutti i giri per una dimensione; da eseguire in un processo nuovo (vedi main)."""
+    import resource
+
+    model = FakeGeminiModel(latency=args.gemini_latency, per_1k_tokens=args.gemini_per_1k)
+    photo_bytes = make_photo()
+    job_text = " ".join(random.Random(1).choices(WORDS, k=300))
+    pdf_bytes = make_pdf(make_cv_pages(size, seed=size))
+    metrics = Metrics(max_records=args.runs * 10)
+    compact = not args.no_compact
+    run_pipeline(pdf_bytes, photo_bytes, job_text, model, Metrics(), compact=compact)  # riscaldamento (template, import)
+    for _ in range(args.runs):
+        if not args.warm:
+            clear_caches()
+        with metrics.stage("total"):
+            run_pipeline(pdf_bytes, photo_bytes, job_text, model, metrics, compact=compact)
+    if pdf_extract._pool is not None:
+        pdf_extract._pool.shutdown(wait=True)  # i worker PDF contano in RUSAGE_CHILDREN solo una volta terminati
+
+    stages = {}
+    for r in metrics.records:
+        stages.setdefault(r['stage'], []).append(r['seconds'] * 1000)
+    prompt_tokens = next(r['prompt_tokens'] for r in metrics.records if r['stage'] == 'gemini')
+    # RSS di picco del processo (buffer nativi di PIL e lxml compresi) e del worker PDF piu' grande
+    return {"pdf_bytes": len(pdf_bytes), "prompt_tokens": prompt_tokens,
+            "peak_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+            "peak_rss_children_mb": _rss_mb(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss),
+            "stages": {name: {"p50_ms": percentile(v, 0.5), "p95_ms": percentile(v, 0.95),
+                              "p99_ms": percentile(v, 0.99), "max_ms": max(v)} for name, v in stages.items()}}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 3, 8, 20], help="CV sizes in pages")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="simulated model latency in seconds")
+    parser.add_argument("--gemini-per-1k", type=float, default=0.0, help="extra simulated latency per 1k prompt tokens")
+    parser.add_argument("--warm", action="store_true", help="keep caches between runs")
+    parser.add_argument("--no-compact", action="store_true", help="send the raw CV text instead of the compacted one")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_size(args.sizes[0], args)))
+        return 0
+
+    # ogni dimensione in un interprete nuovo: il picco di RSS non si azzera dentro un processo
+    child_args = ["--child", "--runs", str(args.runs), "--gemini-latency", str(args.gemini_latency),
+                  "--gemini-per-1k", str(args.gemini_per_1k)] + ["--warm"] * args.warm + ["--no-compact"] * args.no_compact
+    report = {}
+    for size in args.sizes:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--sizes", str(size)] + child_args,
+                             capture_output=True, text=True, check=True)
+        report[size] = row = json.loads(out.stdout.strip().splitlines()[-1])
+
+        print(f"\n== CV {size} page(s), {row['pdf_bytes'] / 1024:.0f} KiB PDF, ~{row['prompt_tokens']} prompt tokens, "
+              f"peak RSS {row['peak_rss_mb']:.0f} MiB (PDF workers {row['peak_rss_children_mb']:.0f} MiB) ==")
+        print(f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, stage in row["stages"].items():
+            print(f"{name:<20}{stage['p50_ms']:>10.1f}{stage['p95_ms']:>10.1f}{stage['p99_ms']:>10.1f}{stage['max_ms']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
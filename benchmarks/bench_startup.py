@@ -0,0 +1,50 @@
+"""Tempo di import a freddo dei moduli dell'app, lazy contro eager.
+
+    python benchmarks/bench_startup.py --runs 7
+
+Ogni misura gira in un interprete nuovo. "lazy" importa solo cio' che
+streamlit_app.py importa all'avvio; "eager" aggiunge le dipendenze pesanti
+che prima venivano importate in testa al file.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULES = ("import cache, cv_compact, docx_render, generation, generation_queue, job_search, json_stream, metrics, "
+               "photo, pdf_extract, ranking")
+HEAVY_MODULES = "import google.generativeai, pypdf, docx, PIL.Image, serpapi"
+
+SCENARIOS = {
+    "streamlit": "import streamlit",
+    "lazy": f"import streamlit; {APP_MODULES}",
+    "eager": f"import streamlit; {APP_MODULES}; {HEAVY_MODULES}",
+}
+
+
+def measure(stmt):
+    code = ("import time, warnings; warnings.simplefilter('ignore'); t = time.perf_counter(); "
+            f"{stmt}; print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    results = {name: [measure(stmt) for _ in range(args.runs)] for name, stmt in SCENARIOS.items()}
+    base = statistics.median(results["streamlit"])
+    print(f"{'scenario':<12}{'median ms':>12}{'over streamlit ms':>20}")
+    for name, values in results.items():
+        med = statistics.median(values)
+        print(f"{name:<12}{med * 1000:>12.1f}{(med - base) * 1000:>20.1f}")
+    saved = statistics.median(results["eager"]) - statistics.median(results["lazy"])
+    print(f"\nlazy imports save {saved * 1000:.0f} ms per cold start")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, (bytes, bytearray)):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        h.update(len(part).to_bytes(8, 'big'))
+        h.update(part)
+    return h.hexdigest()
+
+
+class TieredCache:
+    """LRU in memoria + livello opzionale su disco (TTL e limite in byte).
+
+    I valori devono essere serializzabili in JSON; le chiavi si ottengono con make_key().
+    """
+
+    def __init__(self, max_entries=128, ttl=7 * 24 * 3600, cache_dir=None, max_disk_bytes=50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._mem[key]
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        entry = (time.time(), value)
+        with self._lock:
+            self._remember(key, entry)
+            self._write_disk(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self.cache_dir:
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith('.json'):
+                        try:
+                            os.remove(os.path.join(self.cache_dir, name))
+                        except OSError:
+                            pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0, "mem_entries": len(self._mem)}
+
+    def _remember(self, key, entry):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            created, value = float(raw['created']), raw['value']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # file illeggibile o di forma sbagliata: come un miss
+        if self._expired(created):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # l'mtime fa da "ultimo accesso" per l'eviction
+        except OSError:
+            pass
+        return created, value
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"created": entry[0], "value": entry[1]}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            files.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+        if total <= self.max_disk_bytes:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,153 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+
+from cache import TieredCache, make_key
+from docx_render import SECTION_TITLES
+
+TOKEN_BUDGET = int(os.environ.get("GCC_CV_TOKEN_BUDGET", 3000))
+CHARS_PER_TOKEN = 4   # stima prudente, senza tokenizer
+
+# righe che sono solo numeri/indicazioni di pagina
+_PAGE_RE = re.compile(r"^(?:[-–—\s]*\d{1,2}[-–—\s]*|(?:page|pagina|seite|página|p\.)\s*\d+(?:\s*(?:of|di|von|de|/)\s*\d+)?)$", re.I)
+MIN_DEDUPE_CHARS = 25  # righe brevi ripetute (es. "Mansioni:") sono struttura, non duplicati
+CONTACT_CHARS = 300    # righe iniziali (nome, contatti) che il taglio non tocca mai
+_HYPHEN_RE = re.compile(r"(\w)-\n(\w)")
+_SPACES_RE = re.compile(r"[ \t ]+")
+_HEADING_WORDS = {w.lower() for titles in SECTION_TITLES.values() for w in titles.values()} | {
+    "experience", "work experience", "employment", "education", "skills", "languages", "interests",
+    "profile", "summary", "certifications", "projects", "references", "esperienze", "formazione",
+    "berufserfahrung", "ausbildung", "kenntnisse", "sprachen", "expérience", "formation", "compétences",
+    "contact", "contacts", "kontakt", "contatti",
+}
+# priorita' nel taglio: prima si accorciano le sezioni con valore piu' basso
+_PRIORITY = {"personal": 9, "contact": 9, "kontakt": 9, "contatti": 9, "experience": 5, "profile": 4, "summary": 4, "skills": 4, "education": 3, "languages": 3,
+             "certifications": 2, "projects": 2, "interests": 1, "references": 0}
+
+_compact_cache = TieredCache(max_entries=64, ttl=None)
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class CompactCv:
+    def __init__(self, text, sections, tokens_before):
+        self.text = text
+        self.sections = sections
+        self.tokens_before = tokens_before
+        self.tokens = estimate_tokens(text)
+
+
+def _clean_lines(page):
+    page = unicodedata.normalize("NFKC", page)
+    page = _HYPHEN_RE.sub(r"\1\2", page)
+    return [_SPACES_RE.sub(" ", line).strip() for line in page.splitlines()]
+
+def _is_known_heading(line):
+    return line.lower().rstrip(":") in _HEADING_WORDS
+
+def _is_caps_heading(line):
+    letters = [c for c in line if c.isalpha()]
+    return 3 <= len(line) <= 40 and len(letters) >= 3 and all(c.isupper() for c in letters)
+
+def _priority(title):
+    if not title:
+        return 8  # blocco iniziale senza titolo: si accorcia per ultimo, dopo i dati personali
+    low = title.lower()
+    for word, prio in _PRIORITY.items():
+        if word in low:
+            return prio
+    for titles in SECTION_TITLES.values():
+        for key, localized in titles.items():
+            if localized.lower() in low:
+                return _PRIORITY.get(key.split('_')[0], 2)
+    return 2
+
+def split_sections(lines):
+    # le righe tutte maiuscole contano come titoli solo dopo il primo titolo noto:
+    # prima c'e' l'intestazione, dove "JOHN DOE" e' il nome, non una sezione
+    sections = [["", []]]
+    known = False
+    for line in lines:
+        if _is_known_heading(line) or (known and _is_caps_heading(line)):
+            known = True
+            sections.append([line.rstrip(":"), []])
+        else:
+            sections[-1][1].append(line)
+    return [(title, body) for title, body in sections if title or body]
+
+def _contact_lines(body):
+    # quante righe iniziali stanno in CONTACT_CHARS (almeno una)
+    n, chars = 0, 0
+    while n < len(body) and chars < CONTACT_CHARS:
+        chars += len(body[n]) + 1
+        n += 1
+    return max(n, 1)
+
+def _fit_budget(sections, budget_chars):
+    # si tolgono righe dal fondo delle sezioni meno importanti; poi, se non basta,
+    # sezioni intere. Le righe di contatto (_contact_lines) restano in ogni caso.
+    def size(secs):
+        return sum(len(t) + 1 + sum(len(l) + 1 for l in b) for t, b in secs)
+    sections = [(t, list(b)) for t, b in sections]
+    # nome e contatti: blocco iniziale senza titolo o sezione dei dati personali
+    contact = [(i == 0 and not t) or _priority(t) == 9 for i, (t, _) in enumerate(sections)]
+    keep = [_contact_lines(b) if c else 1 for c, (_, b) in zip(contact, sections)]
+    order = sorted(range(len(sections)), key=lambda i: (_priority(sections[i][0]), -i))
+    total = size(sections)
+    for i in order:
+        body = sections[i][1]
+        while total > budget_chars and len(body) > keep[i]:
+            total -= len(body.pop()) + 1
+        if total <= budget_chars:
+            break
+    if total > budget_chars:
+        for i in order:
+            title, body = sections[i]
+            if total <= budget_chars:
+                break
+            if contact[i]:
+                continue
+            total -= len(title) + 1 + sum(len(l) + 1 for l in body)
+            sections[i] = (title, [])
+        sections = [(t, b) for t, b in sections if b]
+    return sections
+
+def compact_cv(pages, token_budget=TOKEN_BUDGET):
+    """Normalizza il testo del CV (pagine di iter_pdf_pages) e lo riduce al budget di token.
+
+    Toglie intestazioni/piedi ripetuti su piu' pagine, numeri di pagina, righe
+    duplicate e spazi; divide in sezioni e, se serve, accorcia prima quelle
+    meno importanti. Il risultato e' in cache per contenuto.
+    """
+    if isinstance(pages, str):
+        pages = [pages]
+    key = make_key("cv_compact", list(pages), token_budget)
+    cached = _compact_cache.get(key)
+    if cached is not None:
+        return cached
+
+    page_lines = [[l for l in _clean_lines(p) if l] for p in pages]
+    # intestazioni e pie' di pagina: righe presenti su piu' pagine, tenute una volta sola
+    seen_on = Counter(l.lower() for lines in page_lines for l in set(lines))
+    repeated = {l for l, n in seen_on.items() if n >= 2}
+
+    lines = []
+    seen = set()
+    for page in page_lines:
+        for line in page:
+            low = line.lower()
+            if _PAGE_RE.match(line):
+                continue
+            if low in seen and (low in repeated or len(low) >= MIN_DEDUPE_CHARS):
+                continue
+            seen.add(low)
+            lines.append(line)
+
+    sections = _fit_budget(split_sections(lines), token_budget * CHARS_PER_TOKEN)
+    text = "\n\n".join("\n".join(([title] if title else []) + body) for title, body in sections)
+    result = CompactCv(text, [title for title, _ in sections], estimate_tokens("\n".join(pages)))
+    _compact_cache.set(key, result)
+    return result
@@ -0,0 +1,191 @@
+import copy
+import io
+from datetime import datetime
+from functools import lru_cache
+
+# python-docx viene importato dentro le funzioni: l'app carica questo modulo
+# (SECTION_TITLES, get_todays_date) molto prima di dover creare un documento.
+
+SECTION_TITLES = {
+    'it': {'experience': 'ESPERIENZA PROFESSIONALE', 'education': 'ISTRUZIONE', 'skills': 'COMPETENZE', 'languages': 'LINGUE', 'interests': 'INTERESSI', 'personal_info': 'DATI PERSONALI', 'profile_summary': 'PROFILO PERSONALE'},
+    'de_ch': {'experience': 'BERUFSERFAHRUNG', 'education': 'AUSBILDUNG', 'skills': 'KENNTNISSE', 'languages': 'SPRACHEN', 'interests': 'INTERESSEN', 'personal_info': 'PERSÖNLICHE DATEN', 'profile_summary': 'PERSÖNLICHES PROFIL'},
+    'de_de': {'experience': 'BERUFSERFAHRUNG', 'education': 'AUSBILDUNG', 'skills': 'KENNTNISSE', 'languages': 'SPRACHEN', 'interests': 'INTERESSEN', 'personal_info': 'PERSÖNLICHE DATEN', 'profile_summary': 'PERSÖNLICHES PROFIL'},
+    'fr': {'experience': 'EXPÉRIENCE PROFESSIONNELLE', 'education': 'FORMATION', 'skills': 'COMPÉTENCES', 'languages': 'LANGUES', 'interests': 'INTÉRÊTS', 'personal_info': 'INFORMATIONS PERSONNELLES', 'profile_summary': 'PROFIL PROFESSIONNEL'},
+    'en_us': {'experience': 'PROFESSIONAL EXPERIENCE', 'education': 'EDUCATION', 'skills': 'SKILLS', 'languages': 'LANGUAGES', 'interests': 'INTERESTS', 'personal_info': 'PERSONAL DETAILS', 'profile_summary': 'PROFILE'},
+    'en_uk': {'experience': 'WORK EXPERIENCE', 'education': 'EDUCATION', 'skills': 'SKILLS', 'languages': 'LANGUAGES', 'interests': 'INTERESTS', 'personal_info': 'PERSONAL DETAILS', 'profile_summary': 'PROFILE'},
+    'es': {'experience': 'EXPERIENCIA LABORAL', 'education': 'EDUCACIÓN', 'skills': 'HABILIDADES', 'languages': 'IDIOMAS', 'interests': 'INTERESES', 'personal_info': 'DATOS PERSONALES', 'profile_summary': 'PERFIL PROFESIONAL'},
+    'pt': {'experience': 'EXPERIÊNCIA PROFISSIONAL', 'education': 'EDUCAÇÃO', 'skills': 'COMPETÊNCIAS', 'languages': 'IDIOMAS', 'interests': 'INTERESSES', 'personal_info': 'DADOS PESSOAIS', 'profile_summary': 'PERFIL PROFISSIONAL'}
+}
+
+
+def set_table_background(cell, color_hex):
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    shading_elm = parse_xml(r'<w:shd {} w:fill="{}"/>'.format(nsdecls('w'), color_hex))
+    cell._tc.get_or_add_tcPr().append(shading_elm)
+
+def add_bottom_border(paragraph):
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    pPr = paragraph._p.get_or_add_pPr()
+    pBdr = parse_xml(r'<w:pBdr {}><w:bottom w:val="single" w:sz="6" w:space="1" w:color="20547D"/></w:pBdr>'.format(nsdecls('w')))
+    pPr.append(pBdr)
+
+def get_todays_date(lang_code):
+    now = datetime.now()
+    if lang_code in ['de_ch', 'de_de', 'it', 'fr', 'es', 'pt']:
+        return now.strftime("%d.%m.%Y")
+    return now.strftime("%B %d, %Y")
+
+# --- TEMPLATE ---
+# Il documento base (tabella d'intestazione gia' formattata + paragrafi "prototipo"
+# per titoli di sezione e punti elenco) viene costruito e analizzato una volta per
+# processo; ogni render ne fa una copia profonda e clona i prototipi invece di
+# rifare formattazione e ricerca degli stili per nome.
+@lru_cache(maxsize=None)
+def _cv_template():
+    from docx import Document
+    from docx.enum.table import WD_ROW_HEIGHT_RULE, WD_CELL_VERTICAL_ALIGNMENT
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches, Pt, RGBColor
+
+    doc = Document()
+
+    table = doc.add_table(rows=1, cols=2)
+    table.autofit = False
+    table.columns[0].width = Inches(1.2)
+    table.columns[1].width = Inches(6.1)
+
+    row = table.rows[0]
+    row.height = Inches(2.0)
+    row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+
+    set_table_background(row.cells[0], "20547D")
+    set_table_background(row.cells[1], "20547D")
+
+    cell_foto = row.cells[0]
+    cell_foto.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+    p = cell_foto.paragraphs[0]
+    p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    p.paragraph_format.space_before = Pt(0)
+    p.paragraph_format.space_after = Pt(0)
+    p.paragraph_format.line_spacing = 1.0
+
+    cell_text = row.cells[1]
+    cell_text.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+    p_name = cell_text.paragraphs[0]
+    p_name.paragraph_format.space_before = Pt(0)
+    p_name.paragraph_format.space_after = Pt(0)
+    p_name.paragraph_format.line_spacing = 1.0
+    run_name = p_name.add_run("")
+    run_name.font.color.rgb = RGBColor(255, 255, 255)
+    run_name.font.size = Pt(24)
+    run_name.bold = True
+
+    p_info = cell_text.add_paragraph()
+    p_info.paragraph_format.space_before = Pt(0)
+    run_info = p_info.add_run("")
+    run_info.font.color.rgb = RGBColor(255, 255, 255)
+
+    doc.add_paragraph("")
+
+    h = doc.add_paragraph("-")
+    h.style = 'Heading 2'
+    add_bottom_border(h)
+    run_h = h.runs[0]
+    run_h.font.color.rgb = RGBColor(32, 84, 125)
+    run_h.font.bold = True
+
+    bullet = doc.add_paragraph("-", style='List Bullet')
+
+    prototypes = {}
+    for name, p in (('heading', h), ('bullet', bullet)):
+        prototypes[name] = p._p
+        p._p.getparent().remove(p._p)
+    # si ricarica una volta da byte: sul documento ottenuto non si accede mai a
+    # tabelle/paragrafi, cosi' la copia profonda resta coerente (lxml ignora il
+    # memo di deepcopy, e gli oggetti python-docx in cache punterebbero a copie diverse)
+    bio = io.BytesIO()
+    doc.save(bio)
+    return Document(bio), prototypes
+
+def _add_from_prototype(doc, proto, text):
+    from docx.text.paragraph import Paragraph
+    p = copy.deepcopy(proto)
+    doc.element.body._insert_p(p)
+    if text:
+        p.r_lst[0].text = text
+    else:
+        p.remove(p.r_lst[0])  # come add_paragraph(""): nessun run
+    return Paragraph(p, doc._body)
+
+def create_cv_docx(json_data, photo, lang_code):
+    # photo: byte dell'immagine gia' elaborata (photo.process_photo), inseriti cosi' come sono
+    from docx.shared import Inches
+
+    template, prototypes = _cv_template()
+    doc = copy.deepcopy(template)
+
+    row = doc.tables[0].rows[0]
+    if photo:
+        run = row.cells[0].paragraphs[0].add_run()
+        run.add_picture(io.BytesIO(photo), height=Inches(1.5))
+
+    p_name, p_info = row.cells[1].paragraphs[:2]
+    p_name.runs[0].text = json_data['personal_info'].get('name', '')
+    p_info.runs[0].text = f"{json_data['personal_info'].get('address','')} | {json_data['personal_info'].get('phone','')} | {json_data['personal_info'].get('email','')}"
+
+    titles = SECTION_TITLES.get(lang_code, SECTION_TITLES['en_us'])
+
+    if 'profile_summary' in json_data['cv_sections']:
+        _add_from_prototype(doc, prototypes['heading'], titles['profile_summary'])
+        doc.add_paragraph(json_data['cv_sections']['profile_summary'].replace('**', ''))
+        doc.add_paragraph("")
+
+    sections = ['experience', 'education', 'skills', 'languages', 'interests']
+    for key in sections:
+        if key in json_data['cv_sections'] and json_data['cv_sections'][key]:
+            _add_from_prototype(doc, prototypes['heading'], titles[key])
+
+            items = json_data['cv_sections'][key]
+            if isinstance(items, list):
+                for item in items:
+                    _add_from_prototype(doc, prototypes['bullet'], item.replace('**', ''))
+                    if key in ['experience', 'education']:
+                        doc.add_paragraph("")
+            else:
+                doc.add_paragraph(str(items).replace('**', ''))
+                doc.add_paragraph("")
+
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio
+
+def create_letter_docx(letter_data, personal_info, lang_code):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+
+    doc = Document()
+    p = doc.add_paragraph()
+    p.add_run(f"{personal_info.get('name')}\n{personal_info.get('address')}\n{personal_info.get('phone')}\n{personal_info.get('email')}")
+    doc.add_paragraph("")
+    p_date = doc.add_paragraph(get_todays_date(lang_code))
+    p_date.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    doc.add_paragraph("")
+    doc.add_paragraph(letter_data.get('recipient_block', 'Recipient'))
+    doc.add_paragraph("")
+    p_subj = doc.add_paragraph(letter_data.get('subject_line', 'Subject'))
+    p_subj.runs[0].bold = True
+    p_subj.runs[0].font.size = Pt(14)
+    doc.add_paragraph("")
+    doc.add_paragraph(letter_data.get('body_content', 'Body'))
+    doc.add_paragraph("")
+    closing = letter_data.get('closing', 'Best regards').replace(personal_info.get('name', ''), '').strip()
+    p_close = doc.add_paragraph(closing)
+    p_close.paragraph_format.keep_with_next = True
+    for _ in range(4): doc.add_paragraph("")
+    doc.add_paragraph(personal_info.get('name', ''))
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio
@@ -0,0 +1,90 @@
+import json
+import os
+from functools import lru_cache
+
+from cache import TieredCache, make_key
+
+GEMINI_MODEL = "models/gemini-2.5-pro"
+PROMPT_TEMPLATE = "HR Expert. Create CV/Letter in {lang_code}. JSON Keys: personal_info, cv_sections (profile_summary, experience, education, skills, languages, interests), letter_data. NO AI MENTION."
+
+
+@lru_cache(maxsize=1)
+def get_generation_cache():
+    # solo memoria di default: le risposte contengono dati personali (nome, telefono,
+    # email); il livello su disco si attiva esplicitamente con GCC_CACHE_DIR
+    cache_dir = os.environ.get("GCC_CACHE_DIR")
+    ttl = int(os.environ.get("GCC_CACHE_TTL", 7 * 24 * 3600))
+    max_mb = int(os.environ.get("GCC_CACHE_MAX_MB", 50))
+    return TieredCache(max_entries=128, ttl=ttl, cache_dir=cache_dir or None, max_disk_bytes=max_mb * 1024 * 1024)
+
+def build_prompt(lang_code):
+    return PROMPT_TEMPLATE.format(lang_code=lang_code)
+
+def build_contents(pdf_text, job_text, lang_code):
+    # istruzioni e CV (compatto) prima, annuncio per ultimo: per lo stesso CV il
+    # prefisso della richiesta resta identico e il provider lo puo' riusare
+    return [build_prompt(lang_code), pdf_text, job_text]
+
+def generation_key(pdf_text, job_text, lang_code):
+    return make_key(GEMINI_MODEL, build_prompt(lang_code), pdf_text, job_text, lang_code)
+
+def parse_response(text):
+    return json.loads(text.replace("```json", "").replace("```", ""))
+
+def _store(key, text):
+    try:
+        parse_response(text)
+    except ValueError:
+        return  # risposte non valide non vanno in cache
+    get_generation_cache().set(key, text)
+
+@lru_cache(maxsize=4)
+def get_model(api_key):
+    # un solo client per processo (e per chiave), condiviso da tutte le sessioni
+    import google.generativeai as genai  # import lento: solo quando serve davvero
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def _model(api_key, model):
+    # `model` permette di passare un sostituto locale (benchmark, prove offline)
+    return model if model is not None else get_model(api_key)
+
+def generate(pdf_text, job_text, lang_code, api_key, model=None):
+    cache = get_generation_cache()
+    key = generation_key(pdf_text, job_text, lang_code)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    model = _model(api_key, model)
+    response = model.generate_content(build_contents(pdf_text, job_text, lang_code))
+    text = response.text
+    _store(key, text)
+    return text
+
+async def generate_async(pdf_text, job_text, lang_code, model):
+    # la configurazione (api key) e' a carico del chiamante, una sola volta per processo
+    cache = get_generation_cache()
+    key = generation_key(pdf_text, job_text, lang_code)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    response = await model.generate_content_async(build_contents(pdf_text, job_text, lang_code))
+    text = response.text
+    _store(key, text)
+    return text
+
+def generate_stream(pdf_text, job_text, lang_code, api_key, model=None):
+    # produce il testo a pezzi; in cache finisce solo la risposta completa
+    cache = get_generation_cache()
+    key = generation_key(pdf_text, job_text, lang_code)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    model = _model(api_key, model)
+    response = model.generate_content(build_contents(pdf_text, job_text, lang_code), stream=True)
+    parts = []
+    for chunk in response:
+        parts.append(chunk.text)
+        yield chunk.text
+    _store(key, "".join(parts))
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from generation import generate_stream, generation_key, get_generation_cache
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+WORKERS = int(os.environ.get("GCC_GEN_WORKERS", 4))          # chiamate Gemini contemporanee nel processo
+MAX_PENDING = int(os.environ.get("GCC_GEN_MAX_PENDING", 32))  # job in attesa oltre i quali si rifiuta
+MAX_PER_USER = int(os.environ.get("GCC_GEN_PER_USER", 2))     # job attivi per sessione
+KEEP_FINISHED = 15 * 60
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class GenerationJob:
+    def __init__(self, user, pdf_text, job_text, lang_code):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.pdf_text = pdf_text
+        self.job_text = job_text
+        self.lang_code = lang_code
+        self.status = QUEUED
+        self.chunks = []
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.first_chunk = None
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+
+class GenerationQueue:
+    """Coda condivisa da tutte le sessioni per le chiamate a Gemini.
+
+    Un numero fisso di worker limita le chiamate contemporanee; i job in attesa
+    vengono serviti a turno per utente (round robin), cosi' chi ne accoda tanti
+    non blocca gli altri. Oltre MAX_PENDING job in attesa submit() solleva QueueFull.
+    """
+
+    def __init__(self, api_key, workers=WORKERS, max_pending=MAX_PENDING, max_per_user=MAX_PER_USER, model=None):
+        self.api_key = api_key
+        self.model = model
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.running = 0
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()   # utente -> deque di job; l'ordine e' il turno
+        self._jobs = {}
+        self._pending = 0
+        self._threads = [threading.Thread(target=self._worker, name=f"gemini-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user, pdf_text, job_text, lang_code):
+        # una richiesta gia' in cache non aspetta dietro ai job degli altri
+        cached = get_generation_cache().get(generation_key(pdf_text, job_text, lang_code))
+        if cached is not None:
+            job = GenerationJob(user, pdf_text, job_text, lang_code)
+            job.chunks.append(cached)
+            job.status = DONE
+            job.started = job.first_chunk = job.finished = time.time()
+            with self._cond:
+                self._jobs[job.id] = job
+            return job
+        with self._cond:
+            self._prune()
+            if self._pending >= self.max_pending:
+                raise QueueFull("Too many pending generations, try again shortly")
+            if sum(1 for j in self._jobs.values() if j.user == user and j.active) >= self.max_per_user:
+                raise QueueFull("A generation for this session is already running")
+            job = GenerationJob(user, pdf_text, job_text, lang_code)
+            self._jobs[job.id] = job
+            self._queues.setdefault(user, deque()).append(job)
+            self._pending += 1
+            self._cond.notify()
+            return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job):
+        with self._cond:
+            if job.status == QUEUED:
+                queue = self._queues.get(job.user)
+                if queue is not None and job in queue:
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[job.user]
+                    self._pending -= 1
+                job.status = CANCELLED
+                job.finished = time.time()
+            elif job.status == RUNNING:
+                job._cancel.set()  # il worker si ferma al prossimo pezzo dello stream
+
+    def position(self, job):
+        """Job che verranno serviti prima di questo (0 = il prossimo)."""
+        with self._cond:
+            if job.status != QUEUED:
+                return 0
+            queues = [list(q) for q in self._queues.values()]
+            pos = 0
+            for depth in range(max((len(q) for q in queues), default=0)):
+                for q in queues:
+                    if depth < len(q):
+                        if q[depth] is job:
+                            return pos
+                        pos += 1
+            return pos
+
+    def stats(self):
+        with self._cond:
+            return {"pending": self._pending, "running": self.running, "users_waiting": len(self._queues)}
+
+    def _next(self):
+        user, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(user)  # tocca al prossimo utente
+        else:
+            del self._queues[user]
+        self._pending -= 1
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - KEEP_FINISHED
+        for job_id in [i for i, j in self._jobs.items() if not j.active and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                job = self._next()
+                job.status = RUNNING
+                job.started = time.time()
+                self.running += 1
+            status = DONE
+            try:
+                for chunk in generate_stream(job.pdf_text, job.job_text, job.lang_code, self.api_key, model=self.model):
+                    if job._cancel.is_set():
+                        status = CANCELLED
+                        break
+                    if job.first_chunk is None:
+                        job.first_chunk = time.time()
+                    job.chunks.append(chunk)
+            except Exception as e:
+                job.error = str(e)
+                status = FAILED
+            with self._cond:
+                job.status = status
+                job.finished = time.time()
+                self.running -= 1
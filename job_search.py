@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TieredCache, make_key
+
+SEARCH_TTL = int(os.environ.get("GCC_SEARCH_TTL", 3600))
+MAX_PAGES = 3          # 10 risultati per pagina su google_jobs
+MAX_WORKERS = 4
+NO_RESULTS = "hasn't returned any results"   # errore SerpAPI per una ricerca senza risultati
+
+_search_cache = TieredCache(max_entries=256, ttl=SEARCH_TTL)
+
+
+def serpapi_fetch(params):
+    try:
+        from serpapi import GoogleSearch
+    except ImportError:
+        raise RuntimeError("google-search-results is not installed")
+    return GoogleSearch(params).get_dict()
+
+def normalize_job(job):
+    link = None
+    if 'apply_options' in job and len(job['apply_options']) > 0:
+        link = job['apply_options'][0].get('link')
+    if not link and 'job_id' in job:
+        link = f"https://www.google.com/search?ibp=htl;jobs#fpstate=tldetail&htivrt=jobs&htidocid={job['job_id']}"
+    if not link:
+        return None
+    return {"company": job.get("company_name", ""), "role_title": job.get("title", ""), "link": link,
+            "job_id": job.get("job_id"), "location": job.get("location", ""),
+            "description": job.get("description", "")}
+
+def _search_one(role, loc, rad, lang, api_key, max_pages, fetch):
+    key = make_key("google_jobs", role, loc, rad, lang, max_pages)
+    cached = _search_cache.get(key)
+    if cached is not None:
+        return cached
+    params = {"engine": "google_jobs", "q": f"{role} {loc}", "hl": lang, "radius": rad, "api_key": api_key}
+    jobs = []
+    complete = True
+    for _ in range(max_pages):
+        try:
+            res = fetch(params)
+        except Exception:
+            if not jobs:
+                raise
+            complete = False  # pagina successiva fallita: si tiene quanto raccolto
+            break
+        if "error" in res and not res.get("jobs_results"):
+            if NO_RESULTS in res["error"]:
+                break  # pagine finite o nessun risultato
+            if not jobs:
+                raise RuntimeError(res["error"])
+            complete = False
+            break
+        jobs.extend(j for j in map(normalize_job, res.get("jobs_results", [])) if j)
+        token = res.get("serpapi_pagination", {}).get("next_page_token")
+        if not token:
+            break
+        params = dict(params, next_page_token=token)
+    if complete:
+        _search_cache.set(key, jobs)  # un risultato parziale non resta in cache per SEARCH_TTL
+    return jobs
+
+def dedupe_jobs(jobs):
+    seen = set()
+    out = []
+    for job in jobs:
+        ident = job.get("job_id") or job["link"]
+        if ident in seen or job["link"] in seen:
+            continue
+        seen.add(ident)
+        seen.add(job["link"])
+        out.append(job)
+    return out
+
+def search_jobs(role, locations, radii, lang, api_key, max_pages=MAX_PAGES, fetch=serpapi_fetch):
+    """Cerca su tutte le combinazioni (luogo, raggio) in parallelo.
+
+    Ogni combinazione e' in cache per SEARCH_TTL secondi; il risultato e' senza
+    duplicati (job_id o link), nell'ordine delle combinazioni richieste. Una
+    combinazione che fallisce non fa perdere le altre; l'errore viene sollevato
+    solo se falliscono tutte.
+    """
+    combos = [(loc, rad) for loc in locations for rad in radii]
+    if not combos:
+        return []
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(combos))) as pool:
+        futures = [pool.submit(_search_one, role, loc, rad, lang, api_key, max_pages, fetch) for loc, rad in combos]
+        for f in futures:
+            try:
+                results.append(f.result())
+            except Exception as e:
+                errors.append(e)
+    if errors and not results:
+        raise errors[0]
+    return dedupe_jobs([job for jobs in results for job in jobs])
@@ -0,0 +1,124 @@
+import json
+
+_WS = " \t\r\n"
+
+
+class StreamingJsonParser:
+    """Parser incrementale per la risposta del modello.
+
+    feed() accetta pezzi di testo arbitrari e restituisce i valori appena
+    completati come coppie (path, valore): le chiavi di primo livello
+    (es. ('personal_info',)) e le voci dentro cv_sections
+    (es. ('cv_sections', 'experience')). Quello che e' gia' completo resta in
+    .result anche se lo stream si interrompe.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.started = False
+        self.done = False
+        self.in_str = False
+        self.esc = False
+        self.str_start = None
+        self.stack = []
+        self.result = {}
+
+    def _wanted(self, path):
+        return len(path) == 1 or (len(path) == 2 and path[0] == 'cv_sections')
+
+    def _emit(self, frame, end, events):
+        path = frame['path'] + (frame['key'],)
+        start = frame['value_start']
+        frame['key'] = None
+        frame['value_start'] = None
+        frame['phase'] = 'comma'
+        if not self._wanted(path):
+            return
+        try:
+            value = json.loads(self.buf[start:end])
+        except ValueError:
+            return
+        target = self.result
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+            if not isinstance(target, dict):
+                return
+        target[path[-1]] = value
+        events.append((path, value))
+
+    def feed(self, chunk):
+        self.buf += chunk
+        events = []
+        buf = self.buf
+        i = self.pos
+        n = len(buf)
+        while i < n and not self.done:
+            c = buf[i]
+            if not self.started:
+                if c == '{':
+                    self.started = True
+                    self.stack.append({'kind': '{', 'path': (), 'key': None, 'phase': 'key', 'value_start': None})
+                i += 1
+                continue
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif c == '\\':
+                    self.esc = True
+                elif c == '"':
+                    self.in_str = False
+                    self._string_closed(i, events)
+                i += 1
+                continue
+            top = self.stack[-1]
+            if c in _WS:
+                pass
+            elif c == '"':
+                self._value_begins(top, i)
+                self.in_str = True
+                self.str_start = i
+            elif c in '{[':
+                self._value_begins(top, i)
+                path = top['path'] + ((top['key'],) if top['kind'] == '{' else ())
+                self.stack.append({'kind': c, 'path': path, 'key': None, 'phase': 'key', 'value_start': None})
+            elif c in '}]':
+                if top['kind'] == '{' and top['phase'] == 'value' and top['value_start'] is not None:
+                    self._emit(top, i, events)  # scalare non tra virgolette prima di '}'
+                self.stack.pop()
+                if not self.stack:
+                    self.done = True
+                else:
+                    parent = self.stack[-1]
+                    if parent['kind'] == '{' and parent['value_start'] is not None:
+                        self._emit(parent, i + 1, events)
+            elif c == ':':
+                if top['kind'] == '{':
+                    top['phase'] = 'value'
+            elif c == ',':
+                if top['kind'] == '{':
+                    if top['phase'] == 'value' and top['value_start'] is not None:
+                        self._emit(top, i, events)
+                    top['phase'] = 'key'
+            else:
+                self._value_begins(top, i)
+            i += 1
+        self.pos = i
+        return events
+
+    def _value_begins(self, frame, i):
+        if frame['kind'] == '{' and frame['phase'] == 'value' and frame['value_start'] is None:
+            frame['value_start'] = i
+
+    def _string_closed(self, i, events):
+        top = self.stack[-1]
+        if top['kind'] != '{':
+            return
+        if top['phase'] == 'key':
+            try:
+                top['key'] = json.loads(self.buf[self.str_start:i + 1])
+            except ValueError:
+                top['key'] = None
+            top['phase'] = 'colon'
+        elif top['phase'] == 'value' and top['value_start'] == self.str_start:
+            self._emit(top, i + 1, events)
@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class Metrics:
+    """Raccoglie durata e dimensioni di ogni fase (pdf, gemini, docx, ...)."""
+
+    def __init__(self, max_records=500):
+        self.max_records = max_records
+        self.records = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **sizes):
+        # i campi aggiunti a `info` dentro il blocco finiscono nel record
+        info = dict(sizes)
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            info['stage'] = name
+            info['seconds'] = time.perf_counter() - start
+            info['ts'] = time.time()
+            self.add(info)
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+            if len(self.records) > self.max_records:
+                del self.records[:len(self.records) - self.max_records]
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    def summary(self):
+        by_stage = {}
+        with self._lock:
+            for r in self.records:
+                by_stage.setdefault(r['stage'], []).append(r['seconds'])
+        return {name: {"count": len(secs), "total_s": sum(secs), "p50_ms": percentile(secs, 0.5) * 1000,
+                       "p95_ms": percentile(secs, 0.95) * 1000, "max_ms": max(secs) * 1000}
+                for name, secs in by_stage.items()}
+
+    def to_json(self, **extra):
+        with self._lock:
+            records = list(self.records)
+        return json.dumps({"summary": self.summary(), "records": records, **extra}, indent=2, default=str)
@@ -0,0 +1,136 @@
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from cache import TieredCache, make_key
+
+MAX_PDF_BYTES = 20 * 1024 * 1024   # upload piu' grandi vengono rifiutati
+MAX_PAGES = 40                     # pagine oltre il limite vengono ignorate
+MAX_TEXT_CHARS = 400_000           # testo estratto oltre il limite viene troncato
+POOL_WORKERS = min(4, multiprocessing.cpu_count())
+EXTRACT_TIMEOUT = 30               # secondi per l'intera estrazione, poi il pool viene terminato
+
+_page_cache = TieredCache(max_entries=32, ttl=None)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PdfError(ValueError):
+    """PDF illeggibile (corrotto, cifrato) o fuori budget."""
+
+
+class PdfBudgetError(PdfError):
+    pass
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn": fare fork di un server Streamlit multi-thread non e' sicuro
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _drop_pool(pool, kill=False):
+    # il pool si sostituisce solo se e' ancora quello corrente: un'altra sessione
+    # potrebbe averne gia' creato uno nuovo
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if kill:
+        # result(timeout) smette solo di aspettare: il worker bloccato va terminato,
+        # altrimenti tiene occupato il suo posto nel pool all'infinito
+        for proc in list((pool._processes or {}).values()):
+            proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _part_range(n_pages, part, parts):
+    size = -(-n_pages // parts)
+    return part * size, min(n_pages, (part + 1) * size)
+
+def _extract_part(data, part, parts, max_pages):
+    # una parte per worker: i byte del PDF viaggiano e vengono analizzati al piu'
+    # POOL_WORKERS volte, e il conteggio delle pagine avviene gia' nel worker
+    import pypdf
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    start, stop = _part_range(min(len(reader.pages), max_pages), part, parts)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _read_bytes(pdf_file):
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, 'getvalue'):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+def _iter_sequential(data, part, parts, max_pages, deadline):
+    # ultima risorsa, nel processo corrente: la scadenza si controlla tra una pagina e l'altra
+    import pypdf
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    n_pages = min(len(reader.pages), max_pages)
+    for i in range(_part_range(n_pages, part, parts)[0], n_pages):
+        if time.monotonic() > deadline:
+            raise PdfBudgetError("PDF page extraction timed out")
+        yield reader.pages[i].extract_text() or ""
+
+def _iter_extracted(data, max_pages, parts=POOL_WORKERS):
+    # anche i PDF brevi passano dal pool: e' l'unico modo di interrompere
+    # un'estrazione che non termina
+    deadline = time.monotonic() + EXTRACT_TIMEOUT
+    part = 0
+    for _ in range(2):
+        pool = _get_pool()
+        futures = {}
+        try:
+            futures = {p: pool.submit(_extract_part, data, p, parts, max_pages) for p in range(part, parts)}
+            while part < parts:
+                try:
+                    pages = futures[part].result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    _drop_pool(pool, kill=True)
+                    raise PdfBudgetError("PDF page extraction timed out")
+                yield from pages
+                part += 1
+            return
+        except (BrokenProcessPool, CancelledError, RuntimeError):
+            # pool terminato da un'altra sessione (timeout) o non avviabile: si
+            # riprova da dove si era arrivati su un pool nuovo, con la stessa scadenza
+            _drop_pool(pool)
+        finally:
+            for fut in futures.values():
+                fut.cancel()
+    yield from _iter_sequential(data, part, parts, max_pages, deadline)
+
+def iter_pdf_pages(pdf_file, max_pages=MAX_PAGES, max_chars=MAX_TEXT_CHARS):
+    """Restituisce il testo pagina per pagina, usando la cache per contenuto."""
+    data = _read_bytes(pdf_file)
+    if len(data) > MAX_PDF_BYTES:
+        raise PdfBudgetError(f"PDF too large ({len(data)} bytes)")
+    key = make_key(data, max_pages, max_chars)
+    cached = _page_cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    import pypdf
+    pages = []
+    budget = max_chars
+    try:
+        for text in _iter_extracted(data, max_pages):
+            text = text[:budget]
+            budget -= len(text)
+            pages.append(text)
+            yield text
+            if budget <= 0:
+                break
+    except pypdf.errors.PyPdfError as e:
+        raise PdfError(f"Unreadable PDF: {e}") from e
+    _page_cache.set(key, pages)
+
+def extract_text_from_pdf(pdf_file):
+    return "\n".join(iter_pdf_pages(pdf_file))
@@ -0,0 +1,45 @@
+import io
+
+from cache import TieredCache, make_key
+
+PHOTO_HEIGHT_IN = 1.5   # altezza della foto nel CV (vedi create_cv_docx)
+PHOTO_DPI = 300
+JPEG_QUALITY = 88
+
+_photo_cache = TieredCache(max_entries=64, ttl=None)
+
+
+def process_photo(data, border_width, height_in=PHOTO_HEIGHT_IN, dpi=PHOTO_DPI):
+    """Ridimensiona la foto una volta alla misura di stampa e la restituisce come JPEG."""
+    if not data:
+        return None
+    key = make_key(data, border_width, height_in, dpi)
+    cached = _photo_cache.get(key)
+    if cached is not None:
+        return cached
+
+    from PIL import Image, ImageOps
+
+    target_h = max(1, int(height_in * dpi) - 2 * border_width)
+    image = Image.open(io.BytesIO(data))
+    image.draft('RGB', (target_h, target_h))  # JPEG: decodifica gia' ridotta, prima della rotazione EXIF
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+
+    if image.height > target_h:
+        target_w = max(1, round(image.width * target_h / image.height))
+        image = image.resize((target_w, target_h), Image.LANCZOS)
+    if border_width > 0:
+        image = ImageOps.expand(image, border=border_width, fill='white')
+
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=JPEG_QUALITY, optimize=True, dpi=(dpi, dpi))
+    result = out.getvalue()
+    _photo_cache.set(key, result)
+    return result
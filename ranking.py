@@ -0,0 +1,84 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+MATCH_THRESHOLD = 0.15   # coseno TF-IDF sotto cui un annuncio e' poco pertinente
+
+_TOKEN_RE = re.compile(r"[^\W\d_]{3,}")
+STOPWORDS = frozenset("""
+and the for with you your our are will from this that have has not but all can who job work role team
+per con che del della delle dei degli una uno nel nella sono alla alle sul come anche piu
+und der die das mit fur für von den dem ein eine sie wir ihr ist auf aus bei oder zur zum sich
+les des une pour avec dans sur par vous nous est aux qui que pas
+los las del una para con por que sus como mas más
+dos das uma para com por que seu sua como mais
+""".split())
+
+
+def tokenize(text):
+    return [w for w in _TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+class CvIndex:
+    """Termini del CV con tf gia' calcolato: si costruisce una volta per upload."""
+
+    def __init__(self, cv_text):
+        import numpy as np
+        counts = Counter(tokenize(cv_text))
+        self.terms = list(counts)
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+
+    def score(self, texts):
+        """Coseno TF-IDF tra il CV e ogni testo; IDF calcolata su CV + testi."""
+        import numpy as np
+        n = len(texts)
+        if n == 0 or not self.terms:
+            return np.zeros(n)
+        vocab = dict(self.term_ids)
+        rows, cols, counts = [], [], []
+        for row, text in enumerate(texts):
+            for term, c in Counter(tokenize(text)).items():
+                rows.append(row)
+                cols.append(vocab.setdefault(term, len(vocab)))
+                counts.append(c)
+        if not rows:
+            return np.zeros(n)
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        tf = 1.0 + np.log(np.asarray(counts, dtype=np.float64))
+
+        n_cv = len(self.terms)
+        df = np.bincount(cols, minlength=len(vocab)).astype(np.float64)
+        df[:n_cv] += 1  # il CV conta come documento
+        idf = np.log((n + 2) / (df + 1)) + 1.0
+
+        cv_vec = self.tf * idf[:n_cv]
+        cv_norm = np.sqrt(cv_vec @ cv_vec)
+        weights = tf * idf[cols]
+        in_cv = cols < n_cv
+        dots = np.bincount(rows[in_cv], weights[in_cv] * cv_vec[cols[in_cv]], minlength=n)
+        norms = np.sqrt(np.bincount(rows, weights * weights, minlength=n))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = dots / (norms * cv_norm)
+        return np.nan_to_num(scores)
+
+
+@lru_cache(maxsize=16)
+def cv_index(cv_text):
+    return CvIndex(cv_text)
+
+def job_text(job):
+    return " ".join(str(job.get(k, "")) for k in ("role_title", "company", "description"))
+
+def rank_jobs(cv_text, jobs, threshold=MATCH_THRESHOLD):
+    """Ordina i risultati per pertinenza e aggiunge 'match_score' e 'promising'."""
+    if not jobs:
+        return []
+    scores = cv_index(cv_text).score([job_text(j) for j in jobs])
+    ranked = [dict(job, match_score=float(s), promising=bool(s >= threshold)) for job, s in zip(jobs, scores)]
+    ranked.sort(key=lambda j: j["match_score"], reverse=True)
+    return ranked
+
+def match_score(cv_text, ad_text):
+    return float(cv_index(cv_text).score([ad_text])[0])
@@ -1,21 +1,19 @@
 import streamlit as st
-import google.generativeai as genai
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.table import WD_ROW_HEIGHT_RULE, WD_CELL_VERTICAL_ALIGNMENT
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import nsdecls
-from docx.oxml import parse_xml
-import io
-from PIL import Image, ImageOps
-import pypdf
-from datetime import datetime
-import json
-import urllib.parse
-try:
-    from serpapi import GoogleSearch
-except ImportError:
-    GoogleSearch = None
+import importlib
+import threading
+import uuid
+import docx_render
+from cache import make_key
+from cv_compact import compact_cv
+from docx_render import SECTION_TITLES, create_cv_docx, create_letter_docx, get_todays_date
+from generation import get_generation_cache, parse_response
+from generation_queue import QUEUED, DONE, CANCELLED, GenerationQueue
+from job_search import search_jobs
+from json_stream import StreamingJsonParser
+from metrics import Metrics
+from photo import process_photo
+from ranking import match_score, rank_jobs, MATCH_THRESHOLD
+from pdf_extract import PdfError, extract_text_from_pdf, iter_pdf_pages
 
 # --- CONFIGURAZIONE ---
 st.set_page_config(page_title="Global Career Coach", layout="wide", initial_sidebar_state="expanded")
@@ -27,202 +25,135 @@ if 'generated_data' not in st.session_state: st.session_state['generated_data']
 if 'processed_photo' not in st.session_state: st.session_state['processed_photo'] = None
 if 'job_search_results' not in st.session_state: st.session_state['job_search_results'] = None
 if 'pdf_ref' not in st.session_state: st.session_state['pdf_ref'] = None
+if 'metrics' not in st.session_state: st.session_state['metrics'] = Metrics()
+if 'user_id' not in st.session_state: st.session_state['user_id'] = uuid.uuid4().hex
+if 'gen_job' not in st.session_state: st.session_state['gen_job'] = None
+if 'gen_message' not in st.session_state: st.session_state['gen_message'] = None
+metrics = st.session_state['metrics']
 
 # --- DIZIONARI (CON SINTASSI CORRETTA) ---
 LANG_DISPLAY = {"Italiano": "it", "English (US)": "en_us", "English (UK)": "en_uk", "Deutsch (Deutschland)": "de_de", "Deutsch (Schweiz)": "de_ch", "Français": "fr", "Español": "es", "Português": "pt"}
 TRANSLATIONS = {
-    'it': {'sidebar_title': 'Impostazioni Profilo', 'lang_label': 'Lingua', 'photo_label': 'Foto Profilo', 'border_label': 'Bordo (px)', 'preview_label': 'Anteprima', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Carica CV (PDF)', 'upload_help': 'Trascina file qui', 'step2_title': '2. Annuncio di Lavoro', 'job_placeholder': "Incolla qui il testo dell'offerta...", 'btn_label': 'Genera Documenti', 'spinner_msg': 'Elaborazione in corso...', 'tab_cv': 'CV Generato', 'tab_letter': 'Lettera', 'down_cv': 'Scarica CV (Word)', 'down_let': 'Scarica Lettera (Word)', 'success': 'Fatto!', 'error': 'Errore', 'profile_title': 'PROFILO PERSONALE', 'search_sec_title': 'Cerca Lavoro', 'search_role': 'Che lavoro cerchi?', 'search_loc': 'Dove?', 'search_rad': 'Raggio (km)', 'search_btn': 'Trova Lavori 🔎', 'search_res_title': 'Offerte Trovate:', 'search_info': "Copia il testo dell'annuncio e incollalo sotto.", 'no_jobs': 'Nessun lavoro trovato.', 'upload_first': '⚠️ Carica prima il CV!'},
-    'en_us': {'sidebar_title': 'Profile Settings', 'lang_label': 'Language', 'photo_label': 'Profile Photo', 'border_label': 'Border (px)', 'preview_label': 'Preview', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Upload CV (PDF)', 'upload_help': 'Drop file here', 'step2_title': '2. Job Advertisement', 'job_placeholder': 'Paste job offer...', 'btn_label': 'Generate Documents', 'spinner_msg': 'Processing...', 'tab_cv': 'Generated CV', 'tab_letter': 'Cover Letter', 'down_cv': 'Download CV', 'down_let': 'Download Letter', 'success': 'Done!', 'error': 'Error', 'profile_title': 'PROFESSIONAL PROFILE', 'search_sec_title': 'Job Search', 'search_role': 'Job Title', 'search_loc': 'Location', 'search_rad': 'Radius (km)', 'search_btn': 'Find Jobs 🔎', 'search_res_title': 'Found Jobs:', 'search_info': 'Copy the ad text and paste it below.', 'no_jobs': 'No jobs found.', 'upload_first': '⚠️ Upload CV first!'},
-    'de_ch': {'sidebar_title': 'Einstellungen', 'lang_label': 'Sprache', 'photo_label': 'Profilbild', 'border_label': 'Rahmen (px)', 'preview_label': 'Vorschau', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Lebenslauf hochladen (PDF)', 'upload_help': 'Datei hier ablegen', 'step2_title': '2. Stelleninserat', 'job_placeholder': 'Stelleninserat hier einfügen...', 'btn_label': 'Dokumente erstellen', 'spinner_msg': 'Verarbeitung läuft...', 'tab_cv': 'Lebenslauf', 'tab_letter': 'Motivationsschreiben', 'down_cv': 'Lebenslauf laden', 'down_let': 'Brief laden', 'success': 'Fertig!', 'error': 'Fehler', 'profile_title': 'PERSÖNLICHES PROFIL', 'search_sec_title': 'Jobsuche', 'search_role': 'Welcher Job?', 'search_loc': 'Wo?', 'search_rad': 'Umkreis (km)', 'search_btn': 'Jobs suchen 🔎', 'search_res_title': 'Gefundene Jobs:', 'search_info': 'Kopieren Sie den Text und fügen Sie ihn unten ein.', 'no_jobs': 'Keine Jobs gefunden.', 'upload_first': '⚠️ Zuerst Lebenslauf hochladen!'},
-    'de_de': {'sidebar_title': 'Einstellungen', 'lang_label': 'Sprache', 'photo_label': 'Profilbild', 'border_label': 'Rahmen (px)', 'preview_label': 'Vorschau', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Lebenslauf hochladen (PDF)', 'upload_help': 'Datei hier ablegen', 'step2_title': '2. Stellenanzeige', 'job_placeholder': 'Stellenanzeige einfügen...', 'btn_label': 'Dokumente erstellen', 'spinner_msg': 'Verarbeitung läuft...', 'tab_cv': 'Lebenslauf', 'tab_letter': 'Anschreiben', 'down_cv': 'Lebenslauf laden', 'down_let': 'Brief laden', 'success': 'Fertig!', 'error': 'Fehler', 'profile_title': 'PERSÖNLICHES PROFIL', 'search_sec_title': 'Jobsuche', 'search_role': 'Welcher Job?', 'search_loc': 'Wo?', 'search_rad': 'Umkreis (km)', 'search_btn': 'Jobs suchen 🔎', 'search_res_title': 'Gefundene Jobs:', 'search_info': 'Kopieren Sie den Text und fügen Sie ihn unten ein.', 'no_jobs': 'Keine Jobs gefunden.', 'upload_first': '⚠️ Zuerst Lebenslauf hochladen!'},
-    'fr': {'sidebar_title': 'Paramètres du Profil', 'lang_label': 'Langue', 'photo_label': 'Photo de Profil', 'border_label': 'Bordure (px)', 'preview_label': 'Aperçu', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Télécharger CV (PDF)', 'upload_help': 'Déposez le fichier ici', 'step2_title': '2. Offre d\'Emploi', 'job_placeholder': 'Collez le texte de l\'offre ici...', 'btn_label': 'Générer Documents', 'spinner_msg': 'Traitement en cours...', 'tab_cv': 'CV Généré', 'tab_letter': 'Lettre', 'down_cv': 'Télécharger CV (Word)', 'down_let': 'Télécharger Lettre (Word)', 'success': 'Terminé!', 'error': 'Erreur', 'profile_title': 'PROFIL PROFESSIONNEL', 'search_sec_title': 'Recherche Emploi', 'search_role': 'Quel emploi ?', 'search_loc': 'Où ?', 'search_rad': 'Rayon (km)', 'search_btn': 'Trouver Emplois 🔎', 'search_res_title': 'Emplois trouvés :', 'search_info': 'Copiez le texte et collez-le ci-dessous.', 'no_jobs': 'Aucun emploi trouvé.', 'upload_first': '⚠️ Chargez d\'abord le CV!'},
-    'es': {'sidebar_title': 'Configuración', 'lang_label': 'Idioma', 'photo_label': 'Foto', 'border_label': 'Borde (px)', 'preview_label': 'Vista previa', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Subir CV', 'upload_help': 'Arrastra aquí', 'step2_title': '2. Oferta de Empleo', 'job_placeholder': 'Pega la oferta...', 'btn_label': 'Generar', 'spinner_msg': 'Procesando...', 'tab_cv': 'CV Generado', 'tab_letter': 'Carta', 'down_cv': 'Descargar CV', 'down_let': 'Descargar Carta', 'success': 'Hecho', 'error': 'Error', 'profile_title': 'PERFIL PROFESIONAL', 'search_sec_title': 'Buscar Empleo', 'search_role': '¿Qué trabajo?', 'search_loc': '¿Dónde?', 'search_rad': 'Radio (km)', 'search_btn': 'Buscar Empleos 🔎', 'search_res_title': 'Empleos encontrados:', 'search_info': 'Copia el texto y pégalo abajo.', 'no_jobs': 'No se encontraron empleos.', 'upload_first': '⚠️ ¡Sube el CV primero!'},
-    'pt': {'sidebar_title': 'Configurações', 'lang_label': 'Idioma', 'photo_label': 'Foto', 'border_label': 'Borda (px)', 'preview_label': 'Visualizar', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Carregar CV', 'upload_help': 'Arraste aqui', 'step2_title': '2. Anúncio de Emprego', 'job_placeholder': 'Cole o anúncio...', 'btn_label': 'Gerar', 'spinner_msg': 'Processando...', 'tab_cv': 'CV Gerado', 'tab_letter': 'Carta', 'down_cv': 'Baixar CV', 'down_let': 'Baixar Carta', 'success': 'Pronto', 'error': 'Erro', 'profile_title': 'PERFIL PROFISSIONAL', 'search_sec_title': 'Buscar Emprego', 'search_role': 'Qual trabalho?', 'search_loc': 'Onde?', 'search_rad': 'Raio (km)', 'search_btn': 'Buscar Empregos 🔎', 'search_res_title': 'Empregos encontrados:', 'search_info': 'Copie o texto e cole abaixo.', 'no_jobs': 'Nenhum emprego encontrado.', 'upload_first': '⚠️ Carregue o CV primeiro!'},
-    'en_uk': {'sidebar_title': 'Settings', 'lang_label': 'Language', 'photo_label': 'Profile Photo', 'border_label': 'Border (px)', 'preview_label': 'Preview', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Upload CV', 'upload_help': 'Drop file here', 'step2_title': '2. Job Advertisement', 'job_placeholder': 'Paste job offer...', 'btn_label': 'Generate Documents', 'spinner_msg': 'Processing...', 'tab_cv': 'Generated CV', 'tab_letter': 'Cover Letter', 'down_cv': 'Download CV', 'down_let': 'Download Letter', 'success': 'Done!', 'error': 'Error', 'profile_title': 'PROFESSIONAL PROFILE', 'search_sec_title': 'Job Search', 'search_role': 'Job Title', 'search_loc': 'Location', 'search_rad': 'Radius (km)', 'search_btn': 'Find Jobs 🔎', 'search_res_title': 'Found Jobs:', 'search_info': 'Copy the ad text and paste it below.', 'no_jobs': 'No jobs found.', 'upload_first': '⚠️ Upload CV first!'}
-}
-
-SECTION_TITLES = {
-    'it': {'experience': 'ESPERIENZA PROFESSIONALE', 'education': 'ISTRUZIONE', 'skills': 'COMPETENZE', 'languages': 'LINGUE', 'interests': 'INTERESSI', 'personal_info': 'DATI PERSONALI', 'profile_summary': 'PROFILO PERSONALE'},
-    'de_ch': {'experience': 'BERUFSERFAHRUNG', 'education': 'AUSBILDUNG', 'skills': 'KENNTNISSE', 'languages': 'SPRACHEN', 'interests': 'INTERESSEN', 'personal_info': 'PERSÖNLICHE DATEN', 'profile_summary': 'PERSÖNLICHES PROFIL'},
-    'de_de': {'experience': 'BERUFSERFAHRUNG', 'education': 'AUSBILDUNG', 'skills': 'KENNTNISSE', 'languages': 'SPRACHEN', 'interests': 'INTERESSEN', 'personal_info': 'PERSÖNLICHE DATEN', 'profile_summary': 'PERSÖNLICHES PROFIL'},
-    'fr': {'experience': 'EXPÉRIENCE PROFESSIONNELLE', 'education': 'FORMATION', 'skills': 'COMPÉTENCES', 'languages': 'LANGUES', 'interests': 'INTÉRÊTS', 'personal_info': 'INFORMATIONS PERSONNELLES', 'profile_summary': 'PROFIL PROFESSIONNEL'},
-    'en_us': {'experience': 'PROFESSIONAL EXPERIENCE', 'education': 'EDUCATION', 'skills': 'SKILLS', 'languages': 'LANGUAGES', 'interests': 'INTERESTS', 'personal_info': 'PERSONAL DETAILS', 'profile_summary': 'PROFILE'},
-    'en_uk': {'experience': 'WORK EXPERIENCE', 'education': 'EDUCATION', 'skills': 'SKILLS', 'languages': 'LANGUAGES', 'interests': 'INTERESTS', 'personal_info': 'PERSONAL DETAILS', 'profile_summary': 'PROFILE'},
-    'es': {'experience': 'EXPERIENCIA LABORAL', 'education': 'EDUCACIÓN', 'skills': 'HABILIDADES', 'languages': 'IDIOMAS', 'interests': 'INTERESES', 'personal_info': 'DATOS PERSONALES', 'profile_summary': 'PERFIL PROFESIONAL'},
-    'pt': {'experience': 'EXPERIÊNCIA PROFISSIONAL', 'education': 'EDUCAÇÃO', 'skills': 'COMPETÊNCIAS', 'languages': 'IDIOMAS', 'interests': 'INTERESSES', 'personal_info': 'DADOS PESSOAIS', 'profile_summary': 'PERFIL PROFISSIONAL'}
+    'it': {'sidebar_title': 'Impostazioni Profilo', 'lang_label': 'Lingua', 'photo_label': 'Foto Profilo', 'border_label': 'Bordo (px)', 'preview_label': 'Anteprima', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Carica CV (PDF)', 'upload_help': 'Trascina file qui', 'step2_title': '2. Annuncio di Lavoro', 'job_placeholder': "Incolla qui il testo dell'offerta...", 'btn_label': 'Genera Documenti', 'spinner_msg': 'Elaborazione in corso...', 'tab_cv': 'CV Generato', 'tab_letter': 'Lettera', 'down_cv': 'Scarica CV (Word)', 'down_let': 'Scarica Lettera (Word)', 'success': 'Fatto!', 'error': 'Errore', 'profile_title': 'PROFILO PERSONALE', 'search_sec_title': 'Cerca Lavoro', 'search_role': 'Che lavoro cerchi?', 'search_loc': 'Dove?', 'search_rad': 'Raggio (km)', 'search_btn': 'Trova Lavori 🔎', 'search_res_title': 'Offerte Trovate:', 'search_info': "Copia il testo dell'annuncio e incollalo sotto.", 'no_jobs': 'Nessun lavoro trovato.', 'upload_first': '⚠️ Carica prima il CV!', 'cancel': '✖ Annulla'},
+    'en_us': {'sidebar_title': 'Profile Settings', 'lang_label': 'Language', 'photo_label': 'Profile Photo', 'border_label': 'Border (px)', 'preview_label': 'Preview', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Upload CV (PDF)', 'upload_help': 'Drop file here', 'step2_title': '2. Job Advertisement', 'job_placeholder': 'Paste job offer...', 'btn_label': 'Generate Documents', 'spinner_msg': 'Processing...', 'tab_cv': 'Generated CV', 'tab_letter': 'Cover Letter', 'down_cv': 'Download CV', 'down_let': 'Download Letter', 'success': 'Done!', 'error': 'Error', 'profile_title': 'PROFESSIONAL PROFILE', 'search_sec_title': 'Job Search', 'search_role': 'Job Title', 'search_loc': 'Location', 'search_rad': 'Radius (km)', 'search_btn': 'Find Jobs 🔎', 'search_res_title': 'Found Jobs:', 'search_info': 'Copy the ad text and paste it below.', 'no_jobs': 'No jobs found.', 'upload_first': '⚠️ Upload CV first!', 'cancel': '✖ Cancel'},
+    'de_ch': {'sidebar_title': 'Einstellungen', 'lang_label': 'Sprache', 'photo_label': 'Profilbild', 'border_label': 'Rahmen (px)', 'preview_label': 'Vorschau', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Lebenslauf hochladen (PDF)', 'upload_help': 'Datei hier ablegen', 'step2_title': '2. Stelleninserat', 'job_placeholder': 'Stelleninserat hier einfügen...', 'btn_label': 'Dokumente erstellen', 'spinner_msg': 'Verarbeitung läuft...', 'tab_cv': 'Lebenslauf', 'tab_letter': 'Motivationsschreiben', 'down_cv': 'Lebenslauf laden', 'down_let': 'Brief laden', 'success': 'Fertig!', 'error': 'Fehler', 'profile_title': 'PERSÖNLICHES PROFIL', 'search_sec_title': 'Jobsuche', 'search_role': 'Welcher Job?', 'search_loc': 'Wo?', 'search_rad': 'Umkreis (km)', 'search_btn': 'Jobs suchen 🔎', 'search_res_title': 'Gefundene Jobs:', 'search_info': 'Kopieren Sie den Text und fügen Sie ihn unten ein.', 'no_jobs': 'Keine Jobs gefunden.', 'upload_first': '⚠️ Zuerst Lebenslauf hochladen!', 'cancel': '✖ Abbrechen'},
+    'de_de': {'sidebar_title': 'Einstellungen', 'lang_label': 'Sprache', 'photo_label': 'Profilbild', 'border_label': 'Rahmen (px)', 'preview_label': 'Vorschau', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Lebenslauf hochladen (PDF)', 'upload_help': 'Datei hier ablegen', 'step2_title': '2. Stellenanzeige', 'job_placeholder': 'Stellenanzeige einfügen...', 'btn_label': 'Dokumente erstellen', 'spinner_msg': 'Verarbeitung läuft...', 'tab_cv': 'Lebenslauf', 'tab_letter': 'Anschreiben', 'down_cv': 'Lebenslauf laden', 'down_let': 'Brief laden', 'success': 'Fertig!', 'error': 'Fehler', 'profile_title': 'PERSÖNLICHES PROFIL', 'search_sec_title': 'Jobsuche', 'search_role': 'Welcher Job?', 'search_loc': 'Wo?', 'search_rad': 'Umkreis (km)', 'search_btn': 'Jobs suchen 🔎', 'search_res_title': 'Gefundene Jobs:', 'search_info': 'Kopieren Sie den Text und fügen Sie ihn unten ein.', 'no_jobs': 'Keine Jobs gefunden.', 'upload_first': '⚠️ Zuerst Lebenslauf hochladen!', 'cancel': '✖ Abbrechen'},
+    'fr': {'sidebar_title': 'Paramètres du Profil', 'lang_label': 'Langue', 'photo_label': 'Photo de Profil', 'border_label': 'Bordure (px)', 'preview_label': 'Aperçu', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Télécharger CV (PDF)', 'upload_help': 'Déposez le fichier ici', 'step2_title': '2. Offre d\'Emploi', 'job_placeholder': 'Collez le texte de l\'offre ici...', 'btn_label': 'Générer Documents', 'spinner_msg': 'Traitement en cours...', 'tab_cv': 'CV Généré', 'tab_letter': 'Lettre', 'down_cv': 'Télécharger CV (Word)', 'down_let': 'Télécharger Lettre (Word)', 'success': 'Terminé!', 'error': 'Erreur', 'profile_title': 'PROFIL PROFESSIONNEL', 'search_sec_title': 'Recherche Emploi', 'search_role': 'Quel emploi ?', 'search_loc': 'Où ?', 'search_rad': 'Rayon (km)', 'search_btn': 'Trouver Emplois 🔎', 'search_res_title': 'Emplois trouvés :', 'search_info': 'Copiez le texte et collez-le ci-dessous.', 'no_jobs': 'Aucun emploi trouvé.', 'upload_first': '⚠️ Chargez d\'abord le CV!', 'cancel': '✖ Annuler'},
+    'es': {'sidebar_title': 'Configuración', 'lang_label': 'Idioma', 'photo_label': 'Foto', 'border_label': 'Borde (px)', 'preview_label': 'Vista previa', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Subir CV', 'upload_help': 'Arrastra aquí', 'step2_title': '2. Oferta de Empleo', 'job_placeholder': 'Pega la oferta...', 'btn_label': 'Generar', 'spinner_msg': 'Procesando...', 'tab_cv': 'CV Generado', 'tab_letter': 'Carta', 'down_cv': 'Descargar CV', 'down_let': 'Descargar Carta', 'success': 'Hecho', 'error': 'Error', 'profile_title': 'PERFIL PROFESIONAL', 'search_sec_title': 'Buscar Empleo', 'search_role': '¿Qué trabajo?', 'search_loc': '¿Dónde?', 'search_rad': 'Radio (km)', 'search_btn': 'Buscar Empleos 🔎', 'search_res_title': 'Empleos encontrados:', 'search_info': 'Copia el texto y pégalo abajo.', 'no_jobs': 'No se encontraron empleos.', 'upload_first': '⚠️ ¡Sube el CV primero!', 'cancel': '✖ Cancelar'},
+    'pt': {'sidebar_title': 'Configurações', 'lang_label': 'Idioma', 'photo_label': 'Foto', 'border_label': 'Borda (px)', 'preview_label': 'Visualizar', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Carregar CV', 'upload_help': 'Arraste aqui', 'step2_title': '2. Anúncio de Emprego', 'job_placeholder': 'Cole o anúncio...', 'btn_label': 'Gerar', 'spinner_msg': 'Processando...', 'tab_cv': 'CV Gerado', 'tab_letter': 'Carta', 'down_cv': 'Baixar CV', 'down_let': 'Baixar Carta', 'success': 'Pronto', 'error': 'Erro', 'profile_title': 'PERFIL PROFISSIONAL', 'search_sec_title': 'Buscar Emprego', 'search_role': 'Qual trabalho?', 'search_loc': 'Onde?', 'search_rad': 'Raio (km)', 'search_btn': 'Buscar Empregos 🔎', 'search_res_title': 'Empregos encontrados:', 'search_info': 'Copie o texto e cole abaixo.', 'no_jobs': 'Nenhum emprego encontrado.', 'upload_first': '⚠️ Carregue o CV primeiro!', 'cancel': '✖ Cancelar'},
+    'en_uk': {'sidebar_title': 'Settings', 'lang_label': 'Language', 'photo_label': 'Profile Photo', 'border_label': 'Border (px)', 'preview_label': 'Preview', 'main_title': 'Global Career Coach 🌍', 'step1_title': '1. Upload CV', 'upload_help': 'Drop file here', 'step2_title': '2. Job Advertisement', 'job_placeholder': 'Paste job offer...', 'btn_label': 'Generate Documents', 'spinner_msg': 'Processing...', 'tab_cv': 'Generated CV', 'tab_letter': 'Cover Letter', 'down_cv': 'Download CV', 'down_let': 'Download Letter', 'success': 'Done!', 'error': 'Error', 'profile_title': 'PROFESSIONAL PROFILE', 'search_sec_title': 'Job Search', 'search_role': 'Job Title', 'search_loc': 'Location', 'search_rad': 'Radius (km)', 'search_btn': 'Find Jobs 🔎', 'search_res_title': 'Found Jobs:', 'search_info': 'Copy the ad text and paste it below.', 'no_jobs': 'No jobs found.', 'upload_first': '⚠️ Upload CV first!', 'cancel': '✖ Cancel'}
 }
 
 # --- FUNZIONI ---
-def set_table_background(cell, color_hex):
-    shading_elm = parse_xml(r'<w:shd {} w:fill="{}"/>'.format(nsdecls('w'), color_hex))
-    cell._tc.get_or_add_tcPr().append(shading_elm)
-
-def add_bottom_border(paragraph):
-    pPr = paragraph._p.get_or_add_pPr()
-    pBdr = parse_xml(r'<w:pBdr {}><w:bottom w:val="single" w:sz="6" w:space="1" w:color="20547D"/></w:pBdr>'.format(nsdecls('w')))
-    pPr.append(pBdr)
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_cv_docx(render_key, _json_data, _photo, lang_code):
+    # render_key = hash di (JSON generato, foto elaborata, lingua)
+    return create_cv_docx(_json_data, _photo, lang_code).getvalue()
 
-def process_image(image_file, border_width):
-    if image_file is None: return None
-    image = Image.open(image_file)
-    if border_width > 0:
-        image = ImageOps.expand(image, border=border_width, fill='white')
-    return image
-
-def get_todays_date(lang_code):
-    now = datetime.now()
-    if lang_code in ['de_ch', 'de_de', 'it', 'fr', 'es', 'pt']:
-        return now.strftime("%d.%m.%Y")
-    return now.strftime("%B %d, %Y")
-
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = pypdf.PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def create_cv_docx(json_data, pil_image, lang_code):
-    doc = Document()
-    
-    table = doc.add_table(rows=1, cols=2)
-    table.autofit = False
-    table.columns[0].width = Inches(1.2)
-    table.columns[1].width = Inches(6.1)
-    
-    row = table.rows[0]
-    row.height = Inches(2.0)
-    row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
-    
-    set_table_background(row.cells[0], "20547D")
-    set_table_background(row.cells[1], "20547D")
-    
-    cell_foto = row.cells[0]
-    cell_foto.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
-    if pil_image:
-        img_s = io.BytesIO()
-        pil_image.save(img_s, format='PNG')
-        img_s.seek(0)
-        p = cell_foto.paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        p.paragraph_format.space_before = Pt(0)
-        p.paragraph_format.space_after = Pt(0)
-        p.paragraph_format.line_spacing = 1.0
-        run = p.add_run()
-        run.add_picture(img_s, height=Inches(1.5))
-        
-    cell_text = row.cells[1]
-    cell_text.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
-    p_name = cell_text.paragraphs[0]
-    p_name.paragraph_format.space_before = Pt(0)
-    p_name.paragraph_format.space_after = Pt(0)
-    p_name.paragraph_format.line_spacing = 1.0
-    run_name = p_name.add_run(json_data['personal_info'].get('name', ''))
-    run_name.font.color.rgb = RGBColor(255, 255, 255)
-    run_name.font.size = Pt(24)
-    run_name.bold = True
-    
-    p_info = cell_text.add_paragraph()
-    p_info.paragraph_format.space_before = Pt(0)
-    info = f"{json_data['personal_info'].get('address','')} | {json_data['personal_info'].get('phone','')} | {json_data['personal_info'].get('email','')}"
-    run_info = p_info.add_run(info)
-    run_info.font.color.rgb = RGBColor(255, 255, 255)
-    
-    doc.add_paragraph("")
-    
-    titles = SECTION_TITLES.get(lang_code, SECTION_TITLES['en_us'])
-    
-    if 'profile_summary' in json_data['cv_sections']:
-        h = doc.add_paragraph(titles['profile_summary'])
-        h.style = 'Heading 2'
-        add_bottom_border(h)
-        run_h = h.runs[0]
-        run_h.font.color.rgb = RGBColor(32, 84, 125)
-        run_h.font.bold = True
-        doc.add_paragraph(json_data['cv_sections']['profile_summary'].replace('**', ''))
-        doc.add_paragraph("")
-
-    sections = ['experience', 'education', 'skills', 'languages', 'interests']
-    for key in sections:
-        if key in json_data['cv_sections'] and json_data['cv_sections'][key]:
-            h = doc.add_paragraph(titles[key])
-            h.style = 'Heading 2'
-            add_bottom_border(h)
-            run_h = h.runs[0]
-            run_h.font.color.rgb = RGBColor(32, 84, 125)
-            run_h.font.bold = True
-            
-            items = json_data['cv_sections'][key]
-            if isinstance(items, list):
-                for item in items:
-                    p = doc.add_paragraph(item.replace('**', ''), style='List Bullet')
-                    if key in ['experience', 'education']:
-                        doc.add_paragraph("")
-            else:
-                doc.add_paragraph(str(items).replace('**', ''))
-                doc.add_paragraph("")
-    
-    bio = io.BytesIO()
-    doc.save(bio)
-    return bio
-
-def create_letter_docx(letter_data, personal_info, lang_code):
-    doc = Document()
-    p = doc.add_paragraph()
-    p.add_run(f"{personal_info.get('name')}\n{personal_info.get('address')}\n{personal_info.get('phone')}\n{personal_info.get('email')}")
-    doc.add_paragraph("")
-    p_date = doc.add_paragraph(get_todays_date(lang_code))
-    p_date.alignment = WD_ALIGN_PARAGRAPH.LEFT
-    doc.add_paragraph("")
-    doc.add_paragraph(letter_data.get('recipient_block', 'Recipient'))
-    doc.add_paragraph("")
-    p_subj = doc.add_paragraph(letter_data.get('subject_line', 'Subject'))
-    p_subj.runs[0].bold = True
-    p_subj.runs[0].font.size = Pt(14)
-    doc.add_paragraph("")
-    doc.add_paragraph(letter_data.get('body_content', 'Body'))
-    doc.add_paragraph("")
-    closing = letter_data.get('closing', 'Best regards').replace(personal_info.get('name', ''), '').strip()
-    p_close = doc.add_paragraph(closing)
-    p_close.paragraph_format.keep_with_next = True
-    for _ in range(4): doc.add_paragraph("")
-    doc.add_paragraph(personal_info.get('name', ''))
-    bio = io.BytesIO()
-    doc.save(bio)
-    return bio
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_letter_docx(render_key, _letter_data, _personal_info, lang_code):
+    return create_letter_docx(_letter_data, _personal_info, lang_code).getvalue()
 
 def search_jobs_master(role, loc, rad, lang):
     if "SERPAPI_API_KEY" not in st.secrets:
         st.error("SERPAPI Key Missing")
         return []
     
+    # piu' luoghi separati da ";" vengono cercati in parallelo
+    locations = [l.strip() for l in loc.split(';') if l.strip()] or [loc]
     try:
-        params = {"engine": "google_jobs", "q": f"{role} {loc}", "hl": lang, "radius": rad, "api_key": st.secrets["SERPAPI_API_KEY"]}
-        search = GoogleSearch(params)
-        results = search.get_dict().get("jobs_results", [])
-        final_res = []
-        for job in results[:10]:
-            link = None
-            if 'apply_options' in job and len(job['apply_options']) > 0:
-                link = job['apply_options'][0].get('link')
-            if not link and 'job_id' in job:
-                link = f"https://www.google.com/search?ibp=htl;jobs#fpstate=tldetail&htivrt=jobs&htidocid={job['job_id']}"
-            if link:
-                final_res.append({"company": job.get("company_name", ""), "role_title": job.get("title", ""), "link": link})
-        return final_res
+        return search_jobs(role, locations, [rad], lang, st.secrets["SERPAPI_API_KEY"])
     except Exception as e:
         st.error(f"Search Error: {e}")
         return []
 
-def get_gemini_response(pdf_text, job_text, lang_code):
+@st.cache_resource
+def get_generation_queue():
+    # una coda (e un client Gemini) per processo, condivisa da tutte le sessioni
+    return GenerationQueue(st.secrets["GEMINI_API_KEY"])
+
+def show_partial(container, path, value, lang_code):
+    # anteprima progressiva: ogni blocco appare appena e' completo nello stream
+    titles = SECTION_TITLES.get(lang_code, SECTION_TITLES['en_us'])
+    if path == ('personal_info',) and isinstance(value, dict):
+        container.markdown(f"### {value.get('name', '')}")
+        container.caption(f"{value.get('address','')} | {value.get('phone','')} | {value.get('email','')}")
+    elif len(path) == 2 and path[0] == 'cv_sections' and value:
+        container.markdown(f"**{titles.get(path[1], path[1].upper())}**")
+        if isinstance(value, list):
+            container.markdown("\n".join(f"- {str(item).replace('**', '')}" for item in value))
+        else:
+            container.markdown(str(value).replace('**', ''))
+    elif path == ('letter_data',) and isinstance(value, dict):
+        container.divider()
+        container.markdown(f"**{value.get('subject_line', '')}**")
+        container.markdown(value.get('body_content', ''))
+
+def finish_generation(job):
+    parser = StreamingJsonParser()
+    parser.feed(job.text)
+    metrics.add({"stage": "gemini", "seconds": (job.finished - job.started) if job.started else 0.0,
+                 "queued_s": (job.started or job.finished) - job.created, "ts": job.finished,
+                 "first_chunk_s": (job.first_chunk - job.started) if job.first_chunk else None,
+                 "chars_in": len(job.pdf_text) + len(job.job_text), "chars_out": len(job.text), "status": job.status})
+    with metrics.stage("json_parse", chars_in=len(job.text)):
+        try:
+            data = parse_response(job.text)
+        except ValueError:
+            data = parser.result  # si tengono le parti gia' complete
+    if isinstance(data, dict) and data:
+        data.setdefault('personal_info', {})
+        data.setdefault('cv_sections', {})
+        st.session_state['generated_data'] = data
+    if job.status == DONE and isinstance(data, dict) and 'letter_data' in data:
+        st.session_state['gen_message'] = ('success', None)
+    elif job.status != CANCELLED:
+        st.session_state['gen_message'] = ('error', job.error)
+
+@st.fragment(run_every=1.0)
+def generation_status():
+    # gira da solo ogni secondo finche' il job e' attivo, senza rieseguire tutta la pagina;
+    # a job finito st.rerun() ridisegna la pagina senza il frammento e il polling si ferma
+    job = st.session_state['gen_job']
+    if job is None:
+        return
+    if not job.active:
+        finish_generation(job)
+        st.session_state['gen_job'] = None
+        st.rerun()
+    queue = get_generation_queue()
+    col_status, col_cancel = st.columns([4, 1])
+    if job.status == QUEUED:
+        col_status.info(f"⏳ {t['spinner_msg']} (#{queue.position(job) + 1})")
+    else:
+        col_status.info(f"✍️ {t['spinner_msg']}")
+    if col_cancel.button(t['cancel'], key=f"cancel_{job.id}"):
+        queue.cancel(job)
+    parser = StreamingJsonParser()
+    for path, value in parser.feed(job.text):
+        show_partial(st, path, value, st.session_state['lang_code'])
+
+# Le dipendenze pesanti (Gemini SDK, pypdf, python-docx, PIL, serpapi) sono
+# importate dai moduli solo quando servono; dopo il primo render le carichiamo
+# in background, una volta per processo, cosi' il primo click non le aspetta.
+WARM_MODULES = ("pypdf", "docx", "PIL.Image", "numpy", "serpapi", "google.generativeai")
+
+def _warm_imports():
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
     try:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        model = genai.GenerativeModel("models/gemini-2.5-pro")
-        prompt = f"HR Expert. Create CV/Letter in {lang_code}. JSON Keys: personal_info, cv_sections (profile_summary, experience, education, skills, languages, interests), letter_data. NO AI MENTION."
-        response = model.generate_content([prompt, pdf_text, job_text])
-        return response.text
-    except Exception as e:
-        return str(e)
+        docx_render._cv_template()
+    except Exception:
+        pass
+
+@st.cache_resource
+def start_warmup():
+    thread = threading.Thread(target=_warm_imports, name="warm-imports", daemon=True)
+    thread.start()
+    return thread
 
 # --- MAIN APP LOOP ---
 with st.sidebar:
@@ -241,7 +172,13 @@ with st.sidebar:
     st.title(t['sidebar_title'])
     up_photo = st.file_uploader(t['photo_label'], type=['jpg','png'])
     border = st.slider(t['border_label'], 0, 50, 5)
-    st.session_state['processed_photo'] = process_image(up_photo, border)
+    # in sessione solo il JPEG gia' ridimensionato, non l'immagine PIL
+    if up_photo:
+        with metrics.stage("photo", bytes_in=up_photo.size) as m:
+            st.session_state['processed_photo'] = process_photo(up_photo.getvalue(), border)
+            m['bytes_out'] = len(st.session_state['processed_photo'])
+    else:
+        st.session_state['processed_photo'] = None
     if st.session_state['processed_photo']:
         st.image(st.session_state['processed_photo'], caption=t['preview_label'])
         
@@ -253,10 +190,22 @@ with st.sidebar:
     
     if st.button(t['search_btn']):
         if st.session_state.get('pdf_ref'):
-            st.session_state['job_search_results'] = search_jobs_master(role, loc, rad, st.session_state['lang_code'])
+            with metrics.stage("serpapi") as m:
+                results = search_jobs_master(role, loc, rad, st.session_state['lang_code'])
+                m['results'] = len(results)
+            # ordina per affinita' col CV, cosi' si spendono chiamate Gemini solo sugli annunci promettenti
+            try:
+                with metrics.stage("ranking", jobs=len(results)):
+                    results = rank_jobs(extract_text_from_pdf(st.session_state['pdf_ref']), results)
+            except PdfError:
+                pass
+            st.session_state['job_search_results'] = results
         else:
             st.error(t['upload_first'])
 
+    st.divider()
+    debug = st.checkbox("Debug", value=False)
+
 # Main Content
 t = TRANSLATIONS[st.session_state['lang_code']]
 st.title(t['main_title'])
@@ -265,7 +214,8 @@ if st.session_state['job_search_results']:
     st.success(t['search_res_title'])
     st.info(t['search_info'])
     for job in st.session_state['job_search_results']:
-        st.markdown(f"**{job['role_title']}** @ {job['company']}")
+        score = f" {'✅' if job.get('promising') else '⚠️'} {job['match_score']:.0%}" if 'match_score' in job else ""
+        st.markdown(f"**{job['role_title']}** @ {job['company']}{score}")
         st.markdown(f"[👉 Link]({job['link']})")
         st.divider()
 
@@ -275,28 +225,76 @@ if pdf_file: st.session_state['pdf_ref'] = pdf_file
 
 st.subheader(t['step2_title'])
 job_desc = st.text_area("job", placeholder=t['job_placeholder'], height=200, label_visibility="collapsed")
+if pdf_file and job_desc.strip():
+    try:
+        score = match_score(extract_text_from_pdf(pdf_file), job_desc)
+        st.caption(f"{'✅' if score >= MATCH_THRESHOLD else '⚠️'} CV ↔ job match: {score:.0%}")
+    except PdfError:
+        pass
 
-if st.button(t['btn_label']):
+if st.button(t['btn_label'], disabled=st.session_state['gen_job'] is not None):
     if pdf_file and job_desc:
         with st.spinner(t['spinner_msg']):
-            pdf_txt = extract_text_from_pdf(pdf_file)
-            json_res = get_gemini_response(pdf_txt, job_desc, st.session_state['lang_code'])
-            json_res = json_res.replace("```json", "").replace("```", "")
             try:
-                data = json.loads(json_res)
-                st.session_state['generated_data'] = data
-                st.success(t['success'])
-            except:
-                st.error(t['error'])
+                with metrics.stage("pdf_extract", bytes_in=pdf_file.size) as m:
+                    pages = list(iter_pdf_pages(pdf_file))
+                    m['chars_out'] = sum(len(p) for p in pages)
+                # CV compatto: calcolato una volta per upload (cache per contenuto) e
+                # riusato come contesto identico per tutti gli annunci successivi
+                with metrics.stage("cv_compact") as m:
+                    cv_ctx = compact_cv(pages)
+                    m['tokens_before'] = cv_ctx.tokens_before
+                    m['tokens_after'] = cv_ctx.tokens
+                pdf_txt = cv_ctx.text
+            except PdfError as e:
+                st.error(f"{t['error']}: {e}")
+                pdf_txt = None
+        if pdf_txt is not None:
+            try:
+                st.session_state['gen_job'] = get_generation_queue().submit(
+                    st.session_state['user_id'], pdf_txt, job_desc, st.session_state['lang_code'])
+                st.session_state['gen_message'] = None
+            except Exception as e:  # QueueFull, chiave API mancante
+                st.error(f"{t['error']}: {e}")
     else:
         st.warning(t['upload_first'])
 
+if st.session_state['gen_job'] is not None:
+    generation_status()
+
+if st.session_state['gen_message']:
+    kind, detail = st.session_state['gen_message']
+    if kind == 'success':
+        st.success(t['success'])
+    else:
+        st.error(f"{t['error']}: {detail}" if detail else t['error'])
+
 if st.session_state['generated_data']:
     d = st.session_state['generated_data']
     t1, t2 = st.tabs([t['tab_cv'], t['tab_letter']])
     with t1:
-        doc = create_cv_docx(d, st.session_state['processed_photo'], st.session_state['lang_code'])
-        st.download_button(t['down_cv'], doc.getvalue(), "CV.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        cv_key = make_key(d, st.session_state['processed_photo'] or b"", st.session_state['lang_code'])
+        with metrics.stage("create_cv_docx") as m:
+            doc = render_cv_docx(cv_key, d, st.session_state['processed_photo'], st.session_state['lang_code'])
+            m['bytes_out'] = len(doc)
+        st.download_button(t['down_cv'], doc, "CV.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
     with t2:
-        doc = create_letter_docx(d['letter_data'], d['personal_info'], st.session_state['lang_code'])
-        st.download_button(t['down_let'], doc.getvalue(), "Letter.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        if d.get('letter_data'):
+            letter_key = make_key(d['letter_data'], d['personal_info'], st.session_state['lang_code'], get_todays_date(st.session_state['lang_code']))
+            with metrics.stage("create_letter_docx") as m:
+                doc = render_letter_docx(letter_key, d['letter_data'], d['personal_info'], st.session_state['lang_code'])
+                m['bytes_out'] = len(doc)
+            st.download_button(t['down_let'], doc, "Letter.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        else:
+            st.warning(t['error'])
+
+if debug:
+    with st.expander("Debug metrics", expanded=True):
+        summary = metrics.summary()
+        st.dataframe([{"stage": name, **row} for name, row in summary.items()])
+        st.caption(f"Gemini cache: {get_generation_cache().stats()}")
+        if "GEMINI_API_KEY" in st.secrets:
+            st.caption(f"Generation queue: {get_generation_queue().stats()}")
+        st.download_button("metrics.json", metrics.to_json(generation_cache=get_generation_cache().stats()), "metrics.json", "application/json")
+
+start_warmup()
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import batch
+from benchmarks.bench_pipeline import make_cv_pages, make_pdf
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class AsyncFakeModel:
+    """Sostituto locale di Gemini per batch: risponde con un JSON minimo che cita l'annuncio."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = []
+
+    async def generate_content_async(self, parts):
+        self.calls.append(parts[2])
+        await asyncio.sleep(self.delays.get(parts[2], 0))
+        return _Response(json.dumps({"personal_info": {"name": "Jane Doe"}, "cv_sections": {"skills": ["Python"]},
+                                     "letter_data": {"body_content": parts[2]}}))
+
+
+@pytest.fixture
+def cv_path(tmp_path):
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(make_pdf(make_cv_pages(1, lines_per_page=10)))
+    return str(path)
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_same_stem_keeps_the_extension(tmp_path):
+    write(tmp_path / "a.txt", "first")
+    write(tmp_path / "a.md", "second")
+    write(tmp_path / "b.txt", "third")
+    assert [j["id"] for j in batch.load_jobs(str(tmp_path))] == ["a.md", "a.txt", "b"]
+
+
+def test_duplicate_jsonl_ids_are_rejected(tmp_path):
+    path = write(tmp_path / "jobs.jsonl", '{"id": "x", "text": "one"}\n{"id": "x", "text": "two"}\n')
+    with pytest.raises(ValueError, match="duplicate job ids: x"):
+        batch.load_jobs(str(path))
+
+
+def test_output_names_are_unique():
+    jobs = [{"id": "job 1"}, {"id": "job_1"}, {"id": "JOB_1"}, {"id": "job_1-2"}]
+    assert batch._output_names(jobs) == ["job_1", "job_1-2", "JOB_1-3", "job_1-2-2"]
+
+
+def test_colliding_ids_write_separate_files(tmp_path, cv_path):
+    jobs = [{"id": "job 1", "text": "ad one"}, {"id": "job_1", "text": "ad two"}]
+    out = str(tmp_path / "out")
+    results = asyncio.run(batch.run_batch(cv_path, jobs, out, model=AsyncFakeModel(), backoff=0))
+    assert all(r["ok"] for r in results)
+    assert len({r["cv"] for r in results}) == 2
+    assert len([n for n in os.listdir(out) if n.endswith("_CV.docx")]) == 2
+
+
+def test_results_follow_input_order(tmp_path, cv_path):
+    jobs = [{"id": str(i), "text": f"ad {i} " + ("data engineer python" if i != 1 else "florist bouquet")}
+            for i in range(4)]
+    model = AsyncFakeModel(delays={jobs[0]["text"]: 0.05})
+    results = asyncio.run(batch.run_batch(cv_path, jobs, str(tmp_path / "out"), model=model, backoff=0,
+                                          min_score=0.01, compact=False))
+    assert [r["id"] for r in results] == ["0", "1", "2", "3"]
+    assert results[1].get("skipped") and jobs[1]["text"] not in model.calls
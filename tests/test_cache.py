@@ -0,0 +1,46 @@
+import json
+import os
+
+import pytest
+
+from cache import TieredCache, make_key
+
+
+def test_make_key_separates_parts():
+    assert make_key("ab", "c") != make_key("a", "bc")
+    assert make_key({"b": 1, "a": 2}) == make_key({"a": 2, "b": 1})
+
+
+def test_memory_lru_eviction():
+    cache = TieredCache(max_entries=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    TieredCache(cache_dir=str(tmp_path)).set("k", {"x": 1})
+    cache = TieredCache(cache_dir=str(tmp_path))
+    assert cache.get("k") == {"x": 1}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_expired_disk_entry_is_removed(tmp_path):
+    path = os.path.join(str(tmp_path), "k.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created": 0, "value": "old"}, f)
+    assert TieredCache(ttl=60, cache_dir=str(tmp_path)).get("k") is None
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("content", ['{"value": 1}', '{"created": 1}', '[1, 2]', '"text"',
+                                     '{"created": null, "value": 1}', 'not json'])
+def test_malformed_disk_entry_is_a_miss(tmp_path, content):
+    with open(os.path.join(str(tmp_path), "k.json"), "w", encoding="utf-8") as f:
+        f.write(content)
+    cache = TieredCache(ttl=None, cache_dir=str(tmp_path))
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,93 @@
+import cv_compact
+from cv_compact import compact_cv, split_sections
+
+CONTACT = ["JOHN DOE", "Bahnhofstrasse 1, 8001 Zurich", "+41 79 000 00 00", "john.doe@example.com"]
+
+
+def make_cv(n_experience=60):
+    experience = [f"2010-2020 Senior engineer at company number {i}, built data platforms and led teams"
+                  for i in range(n_experience)]
+    return "\n".join(CONTACT + ["PROFILE", "Engineer with twenty years of experience in data systems.",
+                                "WORK EXPERIENCE"] + experience + ["EDUCATION", "MSc Computer Science, ETH Zurich",
+                                                                   "INTERESTS", "Hiking", "Chess"])
+
+
+def setup_function():
+    cv_compact._compact_cache.clear()
+
+
+def test_all_caps_name_is_not_a_section():
+    sections = split_sections(CONTACT + ["SKILLS", "Python", "Data modelling"])
+    assert sections[0] == ("", CONTACT)
+    assert sections[1] == ("SKILLS", ["Python", "Data modelling"])
+
+
+def test_all_caps_headings_after_a_known_one():
+    sections = split_sections(["EDUCATION", "MSc", "VOLUNTEERING", "Red Cross"])
+    assert [title for title, _ in sections] == ["EDUCATION", "VOLUNTEERING"]
+
+
+def test_contact_block_survives_a_tight_budget():
+    result = compact_cv([make_cv()], 500)
+    lines = result.text.splitlines()
+    assert lines[:len(CONTACT)] == CONTACT
+    assert result.tokens < result.tokens_before
+
+
+def test_contact_block_kept_even_when_cv_starts_with_a_heading():
+    contact = ["John Doe"] + CONTACT[1:]
+    text = "\n".join(["PERSONAL DETAILS"] + contact + ["WORK EXPERIENCE"] + [f"Job {i} " * 10 for i in range(80)])
+    result = compact_cv([text], 200)
+    assert result.text.splitlines()[:len(contact) + 1] == ["PERSONAL DETAILS"] + contact
+
+
+def test_lower_priority_sections_trimmed_first():
+    result = compact_cv([make_cv()], 500)
+    assert "MSc Computer Science, ETH Zurich" in result.text
+    assert "Chess" not in result.text
+    assert result.tokens <= 500
+
+
+def test_repeated_headers_and_page_numbers_removed():
+    pages = ["Jane Doe - Curriculum Vitae\nEDUCATION\nBSc Physics\n1",
+             "Jane Doe - Curriculum Vitae\nMSc Physics\nPage 2 of 2"]
+    result = compact_cv(pages)
+    assert result.text.count("Jane Doe - Curriculum Vitae") == 1
+    assert "Page 2" not in result.text
+    assert "\n1\n" not in result.text + "\n"
+
+
+def test_cv_without_known_headings_is_trimmed_to_budget():
+    lines = CONTACT + ["Work History"] + [f"Job {i}: senior engineer at a large company, data platforms" for i in range(200)]
+    result = compact_cv(["\n".join(lines)], 500)
+    assert result.tokens <= 500
+    assert result.text.splitlines()[:len(CONTACT)] == CONTACT
+
+
+def test_cv_starting_with_a_section_is_trimmed_to_budget():
+    text = "\n".join(["WORK EXPERIENCE"] + [f"Job {i}: senior engineer at a large company" for i in range(200)])
+    assert compact_cv([text], 300).tokens <= 300
+
+
+def test_contact_block_is_bounded():
+    lines = [f"Header line {i} with some words in it" for i in range(100)]
+    result = compact_cv(["\n".join(lines)], 20)  # budget sotto CONTACT_CHARS
+    kept = result.text.splitlines()
+    assert kept == lines[:len(kept)]
+    assert cv_compact.CONTACT_CHARS <= sum(len(l) + 1 for l in kept) < cv_compact.CONTACT_CHARS + 40
+
+
+def test_personal_details_section_outranks_education():
+    text = "\n".join(["Jane Doe", "PROFILE", "Data engineer.", "EDUCATION"] + [f"Course {i} in data engineering" for i in range(40)]
+                     + ["PERSÖNLICHE DATEN", "Bahnhofstrasse 1, Zurich", "+41 79 000 00 00", "jane@example.com"])
+    result = compact_cv([text], 120)
+    for line in ("+41 79 000 00 00", "jane@example.com"):
+        assert line in result.text
+    assert result.tokens <= 120
+
+
+def test_benchmark_cv_meets_the_budget():
+    from benchmarks.bench_pipeline import make_cv_pages
+    pages = ["\n".join(page) for page in make_cv_pages(20)]
+    result = compact_cv(pages, 3000)
+    assert result.tokens <= 3000 < result.tokens_before
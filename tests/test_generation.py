@@ -0,0 +1,70 @@
+import pytest
+
+import generation
+from benchmarks.bench_pipeline import FakeGeminiModel
+from cv_compact import compact_cv
+from generation import generate, generate_stream, parse_response
+
+CV = "JANE DOE\njane@example.com\nWORK EXPERIENCE\nData engineer at ACME\nEDUCATION\nMSc Physics"
+
+
+class CountingModel(FakeGeminiModel):
+    """FakeGeminiModel che conta le chiamate e registra i prompt ricevuti."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def generate_content(self, parts, stream=False):
+        self.prompts.append(list(parts))
+        return super().generate_content(parts, stream=stream)
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.delenv("GCC_CACHE_DIR", raising=False)
+    generation.get_generation_cache.cache_clear()
+    yield
+    generation.get_generation_cache.cache_clear()
+
+
+def test_disk_tier_is_off_by_default():
+    assert generation.get_generation_cache().cache_dir is None
+
+
+def test_same_cv_and_ad_hits_the_cache():
+    model = CountingModel()
+    first = generate(CV, "ad one", "en_us", api_key=None, model=model)
+    second = generate(CV, "ad one", "en_us", api_key=None, model=model)
+    assert first == second
+    assert len(model.prompts) == 1
+    assert generation.get_generation_cache().stats()["hits"] == 1
+
+
+def test_stream_shares_the_cache_with_generate():
+    model = CountingModel(chunk_chars=30)
+    streamed = "".join(generate_stream(CV, "ad two", "it", api_key=None, model=model))
+    assert generate(CV, "ad two", "it", api_key=None, model=model) == streamed
+    assert len(model.prompts) == 1
+    assert parse_response(streamed)["personal_info"]["name"] == "Jane Doe"
+
+
+def test_different_ads_reuse_the_same_cv_prefix():
+    model = CountingModel()
+    cv_text = compact_cv([CV]).text
+    for ad in ("ad one", "ad two", "ad three"):
+        generate(cv_text, ad, "de_ch", api_key=None, model=model)
+    assert len(model.prompts) == 3
+    assert len({tuple(p[:2]) for p in model.prompts}) == 1
+    assert [p[2] for p in model.prompts] == ["ad one", "ad two", "ad three"]
+
+
+def test_invalid_responses_are_not_cached():
+    class BrokenModel(CountingModel):
+        def _answer(self, parts):
+            return "not json"
+
+    model = BrokenModel()
+    generate(CV, "ad", "fr", api_key=None, model=model)
+    generate(CV, "ad", "fr", api_key=None, model=model)
+    assert len(model.prompts) == 2
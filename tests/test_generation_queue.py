@@ -0,0 +1,136 @@
+import json
+import queue
+import threading
+import time
+
+import pytest
+
+import generation
+from generation_queue import CANCELLED, DONE, RUNNING, GenerationQueue, QueueFull
+
+ANSWER = json.dumps({"personal_info": {"name": "Jane Doe"}, "cv_sections": {}, "letter_data": {}})
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class GatedModel:
+    """Sostituto di Gemini: ogni richiesta resta in corso finche' il test non apre il suo cancello."""
+
+    def __init__(self):
+        self.started = queue.Queue()
+        self.gates = {}
+
+    def generate_content(self, parts, stream=False):
+        ad = parts[2]
+        gate = self.gates.setdefault(ad, threading.Event())
+        self.started.put(ad)
+
+        def chunks():
+            for piece in (ANSWER[:10], ANSWER[10:]):
+                assert gate.wait(5)
+                yield _Chunk(piece)
+        return chunks()
+
+    def release(self, ad):
+        self.gates.setdefault(ad, threading.Event()).set()
+
+    def next_started(self):
+        return self.started.get(timeout=5)
+
+
+def wait_for(condition, timeout=5):
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.delenv("GCC_CACHE_DIR", raising=False)
+    generation.get_generation_cache.cache_clear()
+    yield
+    generation.get_generation_cache.cache_clear()
+
+
+@pytest.fixture
+def model():
+    model = GatedModel()
+    yield model
+    for gate in list(model.gates.values()):
+        gate.set()
+
+
+def busy_queue(model, **kwargs):
+    # un solo worker, occupato da un job di un altro utente: il resto resta in coda
+    q = GenerationQueue("key", workers=1, model=model, **kwargs)
+    q.submit("other", "cv", "blocker", "it")
+    assert model.next_started() == "blocker"
+    return q
+
+
+def test_round_robin_between_users(model):
+    q = busy_queue(model, max_per_user=3)
+    a1, a2, a3 = (q.submit("a", "cv", f"a{i}", "it") for i in (1, 2, 3))
+    b1 = q.submit("b", "cv", "b1", "it")
+    assert [q.position(j) for j in (a1, b1, a2, a3)] == [0, 1, 2, 3]
+
+    order = []
+    for ad in ("blocker", "a1", "b1", "a2", "a3"):
+        model.release(ad)
+        if ad != "a3":
+            order.append(model.next_started())
+    assert order == ["a1", "b1", "a2", "a3"]
+    wait_for(lambda: a3.status == DONE)
+    assert json.loads(a3.text) == json.loads(ANSWER)
+
+
+def test_per_user_limit(model):
+    q = busy_queue(model, max_per_user=1)
+    q.submit("a", "cv", "a1", "it")
+    with pytest.raises(QueueFull):
+        q.submit("a", "cv", "a2", "it")
+
+
+def test_pending_limit(model):
+    q = busy_queue(model, max_pending=1)
+    q.submit("a", "cv", "a1", "it")
+    with pytest.raises(QueueFull):
+        q.submit("b", "cv", "b1", "it")
+
+
+def test_cancel_queued_job(model):
+    q = busy_queue(model)
+    a1 = q.submit("a", "cv", "a1", "it")
+    b1 = q.submit("b", "cv", "b1", "it")
+    q.cancel(a1)
+    assert a1.status == CANCELLED and not a1.active
+    assert q.position(b1) == 0
+    assert q.stats()["pending"] == 1
+    model.release("blocker")
+    assert model.next_started() == "b1"
+
+
+def test_cancel_running_job(model):
+    q = GenerationQueue("key", workers=1, model=model)
+    job = q.submit("a", "cv", "a1", "it")
+    model.next_started()
+    wait_for(lambda: job.status == RUNNING)
+    q.cancel(job)
+    model.release("a1")
+    wait_for(lambda: not job.active)
+    assert job.status == CANCELLED
+    assert q.stats()["running"] == 0
+
+
+def test_cached_request_skips_the_queue(model):
+    generation.get_generation_cache().set(generation.generation_key("cv", "cached ad", "it"), ANSWER)
+    q = busy_queue(model, max_pending=1)
+    q.submit("a", "cv", "a1", "it")   # coda piena
+    job = q.submit("b", "cv", "cached ad", "it")
+    assert job.status == DONE and job.text == ANSWER
+    assert q.get(job.id) is job
+    assert "cached ad" not in model.gates
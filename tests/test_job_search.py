@@ -0,0 +1,97 @@
+import pytest
+
+import job_search
+from job_search import search_jobs
+
+NO_RESULTS = {"error": "Google hasn't returned any results for this query."}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    job_search._search_cache.clear()
+    yield
+    job_search._search_cache.clear()
+
+
+class FakeSerpApi:
+    """Sostituto locale di SerpAPI: risultati per query, paginati con next_page_token."""
+
+    def __init__(self, results, page_size=10, failures=None):
+        self.results = results
+        self.page_size = page_size
+        self.failures = failures or {}   # (query, pagina) -> eccezione o risposta d'errore
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append(dict(params))
+        jobs = self.results.get(params["q"])
+        if isinstance(jobs, Exception):
+            raise jobs
+        if isinstance(jobs, dict):
+            return jobs  # risposta grezza, es. errore
+        if not jobs:
+            return dict(NO_RESULTS)
+        page = int(params.get("next_page_token", 0))
+        failure = self.failures.pop((params["q"], page), None)
+        if isinstance(failure, Exception):
+            raise failure
+        if failure is not None:
+            return failure
+        res = {"jobs_results": jobs[page * self.page_size:(page + 1) * self.page_size]}
+        if (page + 1) * self.page_size < len(jobs):
+            res["serpapi_pagination"] = {"next_page_token": str(page + 1)}
+        return res
+
+
+def make_jobs(prefix, n):
+    return [{"job_id": f"{prefix}-{i}", "title": "Engineer", "company_name": "ACME",
+             "apply_options": [{"link": f"https://jobs.example/{prefix}/{i}"}]} for i in range(n)]
+
+
+def test_follows_pagination_up_to_max_pages():
+    fetch = FakeSerpApi({"engineer Zurich": make_jobs("zh", 35)})
+    jobs = search_jobs("engineer", ["Zurich"], [20], "en", "key", max_pages=3, fetch=fetch)
+    assert len(jobs) == 30
+    assert [c.get("next_page_token") for c in fetch.calls] == [None, "1", "2"]
+
+
+def test_dedupes_across_locations_and_caches():
+    shared = make_jobs("both", 3)
+    fetch = FakeSerpApi({"engineer Zurich": make_jobs("zh", 2) + shared, "engineer Bern": shared + make_jobs("be", 2)})
+    jobs = search_jobs("engineer", ["Zurich", "Bern"], [20], "en", "key", fetch=fetch)
+    assert [j["job_id"] for j in jobs] == ["zh-0", "zh-1", "both-0", "both-1", "both-2", "be-0", "be-1"]
+    calls = len(fetch.calls)
+    assert search_jobs("engineer", ["Zurich", "Bern"], [20], "en", "key", fetch=fetch) == jobs
+    assert len(fetch.calls) == calls
+
+
+def test_no_results_is_an_empty_result():
+    fetch = FakeSerpApi({})
+    assert search_jobs("engineer", ["Nowhere"], [20], "en", "key", fetch=fetch) == []
+
+
+def test_empty_location_does_not_drop_the_others():
+    fetch = FakeSerpApi({"engineer Zurich": make_jobs("zh", 3), "engineer Bern": []})
+    jobs = search_jobs("engineer", ["Zurich", "Bern"], [20], "en", "key", fetch=fetch)
+    assert [j["job_id"] for j in jobs] == ["zh-0", "zh-1", "zh-2"]
+
+
+def test_failing_location_does_not_drop_the_others():
+    fetch = FakeSerpApi({"engineer Zurich": make_jobs("zh", 2), "engineer Bern": RuntimeError("timeout")})
+    jobs = search_jobs("engineer", ["Zurich", "Bern"], [20], "en", "key", fetch=fetch)
+    assert len(jobs) == 2
+
+
+def test_error_raised_when_every_search_fails():
+    fetch = FakeSerpApi({"engineer Zurich": {"error": "Invalid API key."}})
+    with pytest.raises(RuntimeError, match="Invalid API key"):
+        search_jobs("engineer", ["Zurich"], [20], "en", "key", fetch=fetch)
+
+
+@pytest.mark.parametrize("failure", [RuntimeError("connection reset"), {"error": "Internal server error"}])
+def test_later_page_failure_keeps_earlier_pages_without_caching(failure):
+    fetch = FakeSerpApi({"engineer Zurich": make_jobs("zh", 25)}, failures={("engineer Zurich", 1): failure})
+    jobs = search_jobs("engineer", ["Zurich"], [20], "en", "key", fetch=fetch)
+    assert [j["job_id"] for j in jobs] == [f"zh-{i}" for i in range(10)]
+    # il risultato parziale non e' in cache: la ricerca successiva riprova e completa
+    assert len(search_jobs("engineer", ["Zurich"], [20], "en", "key", fetch=fetch)) == 25
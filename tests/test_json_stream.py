@@ -0,0 +1,83 @@
+import json
+import random
+
+import pytest
+
+from json_stream import StreamingJsonParser
+
+DATA = {
+    "personal_info": {"name": "Zoë \"Z\" O'Neil", "address": "Rue {du} [Lac] 1, Genève", "phone": "+41 00", "email": "z@example.com"},
+    "cv_sections": {
+        "profile_summary": "Line one\nLine \\two\\ with \"quotes\", commas: and {braces} ]",
+        "experience": ["2019-2024 **Lead** at ACME {Zurich}", "2015-2019 Engineer, \"Beta\" [Bern]"],
+        "education": ["MSc école – 2015"],
+        "skills": [],
+        "languages": {"en": "C2", "it": "native"},
+        "interests": None,
+        "years": 12,
+        "remote": True,
+    },
+    "letter_data": {"recipient_block": "HR\nACME", "subject_line": "Application: \"Lead\"", "body_content": "[...]"},
+}
+TEXT = "```json\n" + json.dumps(DATA, ensure_ascii=False, indent=1) + "\n```"
+
+
+def feed_in_chunks(text, sizes):
+    parser = StreamingJsonParser()
+    events = []
+    pos = 0
+    for size in sizes:
+        events.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    events.extend(parser.feed(text[pos:]))
+    return parser, events
+
+
+def expected_events():
+    return [(("personal_info",), DATA["personal_info"])] + \
+           [(("cv_sections", k), v) for k, v in DATA["cv_sections"].items()] + \
+           [(("cv_sections",), DATA["cv_sections"]), (("letter_data",), DATA["letter_data"])]
+
+
+def test_whole_text_in_one_chunk():
+    parser, events = feed_in_chunks(TEXT, [])
+    assert parser.result == DATA
+    assert events == expected_events()
+
+
+def test_one_character_at_a_time():
+    parser, events = feed_in_chunks(TEXT, [1] * len(TEXT))
+    assert parser.result == DATA
+    assert events == expected_events()
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_chunk_boundaries_match_json_loads(seed):
+    rnd = random.Random(seed)
+    sizes = [rnd.randint(1, 40) for _ in range(len(TEXT))]
+    parser, events = feed_in_chunks(TEXT, sizes)
+    assert parser.result == json.loads(json.dumps(DATA))
+    assert events == expected_events()
+
+
+def test_compact_json_and_unquoted_scalars():
+    text = '{"a":1,"b":[1,{"c":"}"}],"cv_sections":{"x":false,"y":-2.5e3},"z":null}'
+    parser, events = feed_in_chunks(text, [3] * len(text))
+    assert parser.result == json.loads(text)
+    assert [path for path, _ in events] == [("a",), ("b",), ("cv_sections", "x"), ("cv_sections", "y"),
+                                            ("cv_sections",), ("z",)]
+
+
+def test_truncated_stream_keeps_completed_parts():
+    cut = TEXT.index('"education"') + 20
+    parser, events = feed_in_chunks(TEXT[:cut], [7] * cut)
+    assert parser.result["personal_info"] == DATA["personal_info"]
+    assert parser.result["cv_sections"] == {k: DATA["cv_sections"][k] for k in ("profile_summary", "experience")}
+    assert "letter_data" not in parser.result
+    assert not parser.done
+
+
+def test_text_after_the_object_is_ignored():
+    parser, _ = feed_in_chunks('{"a": "x"} trailing {"b": 1}', [4] * 10)
+    assert parser.result == {"a": "x"}
+    assert parser.done
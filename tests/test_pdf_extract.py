@@ -0,0 +1,79 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import pdf_extract
+from benchmarks.bench_pipeline import make_cv_pages, make_pdf
+from pdf_extract import PdfBudgetError, PdfError, iter_pdf_pages
+
+PDF = make_pdf(make_cv_pages(10, lines_per_page=8))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    pdf_extract._page_cache.clear()
+    yield
+    pdf_extract._page_cache.clear()
+
+
+def test_extracts_every_page_in_order():
+    pages = list(iter_pdf_pages(PDF))
+    assert len(pages) == 10
+    assert all(p.rstrip().endswith(f"Page {i + 1} of 10") for i, p in enumerate(pages))
+
+
+def test_byte_budget(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "MAX_PDF_BYTES", len(PDF) - 1)
+    with pytest.raises(PdfBudgetError):
+        list(iter_pdf_pages(PDF))
+
+
+def test_page_budget():
+    assert len(list(iter_pdf_pages(PDF, max_pages=3))) == 3
+
+
+def test_char_budget():
+    pages = list(iter_pdf_pages(PDF, max_chars=300))
+    assert sum(len(p) for p in pages) == 300
+    assert len(pages) < 10
+
+
+def test_second_read_is_a_cache_hit():
+    first = list(iter_pdf_pages(PDF))
+    hits = pdf_extract._page_cache.stats()["hits"]
+    assert list(iter_pdf_pages(PDF)) == first
+    assert pdf_extract._page_cache.stats()["hits"] == hits + 1
+
+
+def test_unreadable_pdf():
+    with pytest.raises(PdfError, match="Unreadable PDF"):
+        list(iter_pdf_pages(b"not a pdf"))
+
+
+def test_timeout_replaces_the_pool(monkeypatch):
+    pool = pdf_extract._get_pool()
+    monkeypatch.setattr(pdf_extract, "EXTRACT_TIMEOUT", 0.0)
+    with pytest.raises(PdfBudgetError, match="timed out"):
+        list(iter_pdf_pages(PDF))
+    assert pdf_extract._get_pool() is not pool
+    monkeypatch.setattr(pdf_extract, "EXTRACT_TIMEOUT", 30)
+    assert len(list(iter_pdf_pages(PDF))) == 10
+
+
+def test_broken_pool_is_retried_on_a_new_one(monkeypatch):
+    # come quando un'altra sessione termina il pool condiviso per un timeout
+    class BrokenPool:
+        _processes = None
+
+        def submit(self, *args, **kwargs):
+            fut = Future()
+            fut.set_exception(BrokenProcessPool("terminated"))
+            return fut
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    monkeypatch.setattr(pdf_extract, "_pool", BrokenPool())
+    assert len(list(iter_pdf_pages(PDF))) == 10
+    assert not isinstance(pdf_extract._pool, BrokenPool)